@@ -0,0 +1,203 @@
+"""Participation analytics served from incrementally maintained rollups.
+
+Handlers bump one daily counter row per dimension in the same transaction
+as the change they record, so dashboards read a table sized by
+days x distinct values instead of scanning applications and registrations.
+``rebuild_rollups()`` recomputes everything from the OLTP tables in a few
+GROUP BY passes (backfill or repair).
+"""
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, timedelta
+
+from models import db, Activity, ActivityRegistration, Application, ParticipationRollup
+from statuses import ApplicationStatus
+
+DIMENSIONS = ('college', 'department', 'category')
+BUCKETS = ('day', 'week', 'month')
+
+# Application status -> rollup counter it is counted under
+STATUS_COUNTERS = {
+    ApplicationStatus.APPROVED: 'approved',
+    ApplicationStatus.REJECTED: 'rejected'
+}
+
+COUNTERS = ('submitted', 'approved', 'rejected', 'registrations')
+
+
+def bump(bucket, dimension, value, **deltas):
+    """Add `deltas` to the counters of one rollup row, creating it if needed"""
+    deltas = {counter: delta for counter, delta in deltas.items() if delta}
+    if not deltas or not value:
+        return
+
+    def apply_update():
+        return db.session.execute(
+            update(ParticipationRollup)
+            .where(
+                ParticipationRollup.dimension == dimension,
+                ParticipationRollup.bucket == bucket,
+                ParticipationRollup.value == value
+            )
+            .values(
+                updated_at=datetime.utcnow(),
+                **{counter: getattr(ParticipationRollup, counter) + delta for counter, delta in deltas.items()}
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if apply_update():
+        return
+
+    # A missing row has nothing to take away from: a negative delta means the
+    # change predates the rollups, and must not become a negative counter
+    created = {counter: max(0, deltas.get(counter, 0)) for counter in COUNTERS}
+    if not any(created.values()):
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(ParticipationRollup(
+                bucket=bucket,
+                dimension=dimension,
+                value=value,
+                **created
+            ))
+    except IntegrityError:
+        # Another writer created the row first
+        apply_update()
+
+
+def _application_dimensions(application):
+    """Rollup (dimension, value) pairs an application is counted under"""
+    return (
+        ('college', application.college),
+        ('department', application.department),
+        ('category', application.activity_type)
+    )
+
+
+def _bucket_of(moment):
+    return (moment or datetime.utcnow()).date()
+
+
+def record_application_submitted(application):
+    """Count a newly submitted application"""
+    bucket = _bucket_of(application.submitted_at)
+    counter = STATUS_COUNTERS.get(application.status)
+
+    for dimension, value in _application_dimensions(application):
+        bump(bucket, dimension, value, submitted=1, **({counter: 1} if counter else {}))
+
+
+def record_application_status_change(application, old_status):
+    """Move an application between status counters (bucketed by submission day)"""
+    old_counter = STATUS_COUNTERS.get(old_status)
+    new_counter = STATUS_COUNTERS.get(application.status)
+    if old_counter == new_counter:
+        return
+
+    deltas = {}
+    if old_counter:
+        deltas[old_counter] = -1
+    if new_counter:
+        deltas[new_counter] = deltas.get(new_counter, 0) + 1
+
+    bucket = _bucket_of(application.submitted_at)
+    for dimension, value in _application_dimensions(application):
+        bump(bucket, dimension, value, **deltas)
+
+
+def record_registration(activity, delta=1):
+    """Count an activity registration under the activity's category"""
+    bump(_bucket_of(None), 'category', activity.category, registrations=delta)
+
+
+# ==================== QUERIES ====================
+
+def _period_of(day, bucket):
+    if bucket == 'week':
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if bucket == 'month':
+        return day.strftime('%Y-%m')
+    return day.isoformat()
+
+
+def _rates(counts):
+    decided = counts['approved'] + counts['rejected']
+    counts['approvalRate'] = round(counts['approved'] / decided, 4) if decided else None
+    return counts
+
+
+def participation(dimension, bucket='day', start=None, end=None):
+    """Time-bucketed participation and approval rates for one dimension"""
+    query = ParticipationRollup.query.filter(ParticipationRollup.dimension == dimension)
+    if start:
+        query = query.filter(ParticipationRollup.bucket >= start)
+    if end:
+        query = query.filter(ParticipationRollup.bucket <= end)
+
+    series = {}
+    totals = {}
+    for row in query.all():
+        period = _period_of(row.bucket, bucket)
+        for key, target in (((period, row.value), series), (row.value, totals)):
+            counts = target.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for counter in COUNTERS:
+                counts[counter] += getattr(row, counter)
+
+    return {
+        'dimension': dimension,
+        'bucket': bucket,
+        'series': [
+            _rates({'period': period, 'value': value, **counts})
+            for (period, value), counts in sorted(series.items())
+        ],
+        'totals': [
+            _rates({'value': value, **counts})
+            for value, counts in sorted(totals.items(), key=lambda item: -item[1]['submitted'])
+        ]
+    }
+
+
+# ==================== REBUILD ====================
+
+def _as_date(value):
+    # SQLite returns date() results as strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def rebuild_rollups():
+    """Recompute every rollup row from the applications and registrations tables"""
+    ParticipationRollup.query.delete()
+    rows = {}
+
+    day = func.date(Application.submitted_at)
+    approved = func.sum(case((Application.status == ApplicationStatus.APPROVED, 1), else_=0))
+    rejected = func.sum(case((Application.status == ApplicationStatus.REJECTED, 1), else_=0))
+
+    for dimension, column in (
+        ('college', Application.college),
+        ('department', Application.department),
+        ('category', Application.activity_type)
+    ):
+        for bucket, value, submitted, approved_count, rejected_count in db.session.query(
+            day, column, func.count(Application.id), approved, rejected
+        ).group_by(day, column):
+            row = rows.setdefault((_as_date(bucket), dimension, value), dict.fromkeys(COUNTERS, 0))
+            row.update(submitted=submitted, approved=approved_count or 0, rejected=rejected_count or 0)
+
+    registration_day = func.date(ActivityRegistration.registered_at)
+    for bucket, value, count in db.session.query(
+        registration_day, Activity.category, func.count(ActivityRegistration.id)
+    ).join(Activity, Activity.id == ActivityRegistration.activity_id).group_by(registration_day, Activity.category):
+        row = rows.setdefault((_as_date(bucket), 'category', value), dict.fromkeys(COUNTERS, 0))
+        row['registrations'] = count
+
+    db.session.add_all([
+        ParticipationRollup(bucket=bucket, dimension=dimension, value=value, **counts)
+        for (bucket, dimension, value), counts in rows.items()
+        if value
+    ])
+    db.session.commit()
+    return len(rows)
@@ -35,6 +35,12 @@ async function apiRequest(endpoint, options = {}) {
         defaultHeaders['Authorization'] = `Bearer ${token}`;
     }
     
+    // Campus to sign in to (tokens carry it afterwards)
+    const tenant = localStorage.getItem('tenant');
+    if (tenant) {
+        defaultHeaders['X-Tenant'] = tenant;
+    }
+    
     const config = {
         ...options,
         headers: {
@@ -77,6 +83,28 @@ async function apiRequest(endpoint, options = {}) {
 
 // ==================== AUTH API ====================
 
+async function apiGetTenants() {
+    try {
+        // A campus left in storage from an old configuration must not block the list
+        const response = await apiRequest('/tenants', {
+            method: 'GET',
+            headers: { 'X-Tenant': '' }
+        });
+        return response;
+    } catch (error) {
+        return { success: false, message: error.message, tenants: [] };
+    }
+}
+
+// Campus the next login or sign-up goes to
+function apiSetTenant(tenant) {
+    if (tenant) {
+        localStorage.setItem('tenant', tenant);
+    } else {
+        localStorage.removeItem('tenant');
+    }
+}
+
 async function apiRegister(userData) {
     try {
         const response = await apiRequest('/auth/register', {
@@ -108,7 +136,17 @@ async function apiLogin(credentials) {
     }
 }
 
-function apiLogout() {
+async function apiLogout() {
+    try {
+        // Revoke the token on the server before forgetting it
+        if (getAuthToken()) {
+            await apiRequest('/auth/logout', {
+                method: 'POST'
+            });
+        }
+    } catch (error) {
+        console.error('Logout request failed:', error);
+    }
     localStorage.removeItem('authToken');
     localStorage.removeItem('currentUser');
 }
@@ -284,6 +322,32 @@ async function apiRespondToEmployeeRequest(requestId, status, responseMessage =
     }
 }
 
+// ==================== DASHBOARD API ====================
+
+async function apiGetEmployeeDashboard(fields = '') {
+    try {
+        const query = fields ? `?fields=${encodeURIComponent(fields)}` : '';
+        const response = await apiRequest(`/employee/dashboard${query}`, {
+            method: 'GET'
+        });
+        return response;
+    } catch (error) {
+        return { success: false, message: error.message };
+    }
+}
+
+async function apiGetStudentDashboard(fields = '') {
+    try {
+        const query = fields ? `?fields=${encodeURIComponent(fields)}` : '';
+        const response = await apiRequest(`/student/dashboard${query}`, {
+            method: 'GET'
+        });
+        return response;
+    } catch (error) {
+        return { success: false, message: error.message };
+    }
+}
+
 // ==================== HEALTH CHECK ====================
 
 async function apiHealthCheck() {
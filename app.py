@@ -1,8 +1,10 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 import os
 import sys
 import socket
@@ -18,13 +20,82 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'sqlite:///uni
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+app.config['JOB_POLL_INTERVAL'] = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+app.config['JOB_INLINE_WORKER'] = os.getenv('JOB_INLINE_WORKER', 'False').lower() == 'true'
+app.config['JOB_RETENTION_DAYS'] = int(os.getenv('JOB_RETENTION_DAYS', 7))  # Finished jobs are kept this long
+app.config['LIFECYCLE_SWEEP_INTERVAL'] = float(os.getenv('LIFECYCLE_SWEEP_INTERVAL', 60))
+app.config['LIFECYCLE_BATCH_SIZE'] = int(os.getenv('LIFECYCLE_BATCH_SIZE', 500))
+app.config['REGISTRATION_CONFLICT_POLICY'] = os.getenv('REGISTRATION_CONFLICT_POLICY', 'allow')  # 'allow' or 'reject'
+app.config['IDEMPOTENCY_TTL_HOURS'] = int(os.getenv('IDEMPOTENCY_TTL_HOURS', 24))
+app.config['IDEMPOTENCY_LEASE_SECONDS'] = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 60))  # Longer than the request timeout
+app.config['SYNC_TOMBSTONE_TTL_DAYS'] = int(os.getenv('SYNC_TOMBSTONE_TTL_DAYS', 30))
+app.config['SYNC_WATERMARK_OVERLAP_SECONDS'] = int(os.getenv('SYNC_WATERMARK_OVERLAP_SECONDS', 5))
+app.config['SHED_MAX_IN_FLIGHT'] = int(os.getenv('SHED_MAX_IN_FLIGHT', os.getenv('GUNICORN_THREADS', 16)))  # 0 disables shedding
+app.config['SHED_LOW_PRIORITY_RATIO'] = float(os.getenv('SHED_LOW_PRIORITY_RATIO', 0.5))
+app.config['SHED_NORMAL_PRIORITY_RATIO'] = float(os.getenv('SHED_NORMAL_PRIORITY_RATIO', 0.8))
+app.config['SHED_RETRY_AFTER'] = int(os.getenv('SHED_RETRY_AFTER', 5))
+app.config['READINESS_MAX_POOL_SATURATION'] = float(os.getenv('READINESS_MAX_POOL_SATURATION', 0.9))
+app.config['READINESS_MAX_DB_LATENCY_MS'] = float(os.getenv('READINESS_MAX_DB_LATENCY_MS', 1000))
+app.config['ATTENDANCE_ROSTER_TTL'] = float(os.getenv('ATTENDANCE_ROSTER_TTL', 30))
+app.config['ATTENDANCE_BATCH_SIZE'] = int(os.getenv('ATTENDANCE_BATCH_SIZE', 500))
+app.config['ATTENDANCE_ROSTER_IDLE_TTL'] = float(os.getenv('ATTENDANCE_ROSTER_IDLE_TTL', 600))
+app.config['WRITE_COALESCING'] = os.getenv('WRITE_COALESCING', 'False').lower() == 'true'
+app.config['WRITE_COALESCING_WINDOW_MS'] = float(os.getenv('WRITE_COALESCING_WINDOW_MS', 5))
+app.config['WRITE_COALESCING_MAX_BATCH'] = int(os.getenv('WRITE_COALESCING_MAX_BATCH', 100))
+app.config['REPLICA_DATABASE_URIS'] = os.getenv('REPLICA_DATABASE_URIS', '')  # comma-separated
+app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+app.config['READ_YOUR_WRITES_SECONDS'] = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+app.config['REVOCATION_REFRESH_SECONDS'] = float(os.getenv('REVOCATION_REFRESH_SECONDS', 1))
+app.config['REVOCATION_REBUILD_SECONDS'] = float(os.getenv('REVOCATION_REBUILD_SECONDS', 3600))
+app.config['REVOCATION_REFRESH_OVERLAP_SECONDS'] = float(os.getenv('REVOCATION_REFRESH_OVERLAP_SECONDS', 30))
+app.config['REVOCATION_BLOOM_BITS'] = int(os.getenv('REVOCATION_BLOOM_BITS', 1 << 20))
+app.config['DASHBOARD_MAX_WORKERS'] = int(os.getenv('DASHBOARD_MAX_WORKERS', 4))
+app.config['DEFAULT_TENANT'] = os.getenv('DEFAULT_TENANT', 'main')
+app.config['TENANT_DATABASE_URIS'] = os.getenv('TENANT_DATABASE_URIS', '')  # comma-separated name=uri
+app.config['TENANT_ADMIN_TENANT'] = os.getenv('TENANT_ADMIN_TENANT', app.config['DEFAULT_TENANT'])
+app.config['TENANT_ADMIN_USERNAMES'] = os.getenv('TENANT_ADMIN_USERNAMES', '')  # comma-separated, empty allows nobody
+app.config['TENANT_FANOUT_MAX_WORKERS'] = int(os.getenv('TENANT_FANOUT_MAX_WORKERS', 8))
+app.config['CACHE_VERSION_POLL_SECONDS'] = float(os.getenv('CACHE_VERSION_POLL_SECONDS', 1))
 
 # Initialize extensions
 try:
-    from models import db, User, Activity, Application, ActivityRegistration, EmployeeRequest
+    from replicas import configure_replicas, ensure_heartbeat_table, start_heartbeat_thread, read_only, record_write, note_write
+    configure_replicas(app)
+    from tenants import (configure_tenants, init_tenants, tenant_names, tenant_context, tenant_engine,
+                         tenant_claims, current_tenant, default_tenant, fan_out)
+    configure_tenants(app)
+    from models import db, User, Activity, Application, ActivityRegistration, EmployeeRequest, Notification, IdempotencyKey
+    from jobs import enqueue, queue_metrics, start_worker_thread
+    from lifecycle import start_scheduler_thread
+    from statuses import ApplicationStatus, RequestStatus, RegistrationStatus, label, parse_status, can_transition
+    from migrations import (add_tenant_columns, migrate_status_columns, add_missing_columns, create_missing_indexes,
+                            backfill_rollups)
+    from health import LoadShedder, priority, readiness
+    from attendance import check_in, close_check_in, invalidate_roster
+    from coalescer import init_coalescer, run_write
+    import profiling
+    from idempotency import idempotent
+    from revocation import is_token_revoked, issued_at_claims, revoke_token, revoke_user_tokens, current_cache as revocation_cache
+    from sync import new_watermark, parse_since, deleted_ids, record_withdrawal
+    from changelog import ensure_entity_versions
+    from listings import (active_catalog, activity_entry, catalog_items, application_statistics,
+                          request_statistics, all_applications, my_applications, sent_requests, received_requests,
+                          employee_activities, my_registrations)
+    from dashboard import EMPLOYEE_SECTIONS, STUDENT_SECTIONS, parse_fields, build_dashboard
+    from timetable import find_conflicts, build_timetable, load_student_activities
+    from analytics import (DIMENSIONS, BUCKETS, participation, record_application_submitted,
+                           record_application_status_change, record_registration)
     db.init_app(app)
     CORS(app, resources={r"/*": {"origins": "*"}})
     jwt = JWTManager(app)
+    jwt.token_in_blocklist_loader(is_token_revoked)
+    jwt.additional_claims_loader(lambda identity: {**issued_at_claims(identity), **tenant_claims(identity)})
+    load_shedder = LoadShedder(app)
+    init_coalescer(app)
+    app.after_request(record_write)
+    profiling.init_profiling(app)
+    init_tenants(app)
 except ImportError as e:
     print(f"❌ خطأ في استيراد models: {e}")
     print("❌ Error importing models")
@@ -32,73 +103,89 @@ except ImportError as e:
 
 # Create database tables
 with app.app_context():
-    db.create_all()
-    # Create default activities if none exist
-    if Activity.query.count() == 0:
-        default_activities = [
-            Activity(
-                name='نشاط رياضي',
-                description='أنشطة رياضية متنوعة للطلاب',
-                category='رياضي',
-                available_slots=50,
-                location='الصالة الرياضية',
-                start_date=datetime.now() + timedelta(days=7),
-                end_date=datetime.now() + timedelta(days=37)
-            ),
-            Activity(
-                name='نشاط ثقافي',
-                description='فعاليات ثقافية وأدبية',
-                category='ثقافي',
-                available_slots=100,
-                location='القاعة الكبرى',
-                start_date=datetime.now() + timedelta(days=10),
-                end_date=datetime.now() + timedelta(days=40)
-            ),
-            Activity(
-                name='نشاط فني',
-                description='ورش عمل فنية وإبداعية',
-                category='فني',
-                available_slots=30,
-                location='مركز الفنون',
-                start_date=datetime.now() + timedelta(days=5),
-                end_date=datetime.now() + timedelta(days=35)
-            ),
-            Activity(
-                name='نشاط علمي',
-                description='محاضرات وندوات علمية',
-                category='علمي',
-                available_slots=75,
-                location='مختبر العلوم',
-                start_date=datetime.now() + timedelta(days=14),
-                end_date=datetime.now() + timedelta(days=44)
-            ),
-            Activity(
-                name='نشاط اجتماعي',
-                description='أنشطة تطوعية واجتماعية',
-                category='اجتماعي',
-                available_slots=60,
-                location='مركز الطلاب',
-                start_date=datetime.now() + timedelta(days=3),
-                end_date=datetime.now() + timedelta(days=33)
-            ),
-            Activity(
-                name='نشاط تقني',
-                description='ورش برمجة وتقنية معلومات',
-                category='تقني',
-                available_slots=40,
-                location='معمل الحاسوب',
-                start_date=datetime.now() + timedelta(days=12),
-                end_date=datetime.now() + timedelta(days=42)
-            )
-        ]
-        for activity in default_activities:
-            db.session.add(activity)
-        db.session.commit()
-        print("✅ Default activities created successfully!")
+    for tenant in tenant_names():
+        with tenant_context(tenant):
+            tenant_db = tenant_engine(tenant)
+            db.metadata.create_all(tenant_db)
+            add_tenant_columns(tenant_db, tenant)
+            migrate_status_columns(tenant_db)
+            add_missing_columns(tenant_db)
+            create_missing_indexes(tenant_db)
+            backfill_rollups()
+            ensure_entity_versions()
+            # Create default activities if none exist
+            if Activity.query.count() == 0:
+                default_activities = [
+                    Activity(
+                        name='نشاط رياضي',
+                        description='أنشطة رياضية متنوعة للطلاب',
+                        category='رياضي',
+                        available_slots=50,
+                        location='الصالة الرياضية',
+                        start_date=datetime.now() + timedelta(days=7),
+                        end_date=datetime.now() + timedelta(days=37)
+                    ),
+                    Activity(
+                        name='نشاط ثقافي',
+                        description='فعاليات ثقافية وأدبية',
+                        category='ثقافي',
+                        available_slots=100,
+                        location='القاعة الكبرى',
+                        start_date=datetime.now() + timedelta(days=10),
+                        end_date=datetime.now() + timedelta(days=40)
+                    ),
+                    Activity(
+                        name='نشاط فني',
+                        description='ورش عمل فنية وإبداعية',
+                        category='فني',
+                        available_slots=30,
+                        location='مركز الفنون',
+                        start_date=datetime.now() + timedelta(days=5),
+                        end_date=datetime.now() + timedelta(days=35)
+                    ),
+                    Activity(
+                        name='نشاط علمي',
+                        description='محاضرات وندوات علمية',
+                        category='علمي',
+                        available_slots=75,
+                        location='مختبر العلوم',
+                        start_date=datetime.now() + timedelta(days=14),
+                        end_date=datetime.now() + timedelta(days=44)
+                    ),
+                    Activity(
+                        name='نشاط اجتماعي',
+                        description='أنشطة تطوعية واجتماعية',
+                        category='اجتماعي',
+                        available_slots=60,
+                        location='مركز الطلاب',
+                        start_date=datetime.now() + timedelta(days=3),
+                        end_date=datetime.now() + timedelta(days=33)
+                    ),
+                    Activity(
+                        name='نشاط تقني',
+                        description='ورش برمجة وتقنية معلومات',
+                        category='تقني',
+                        available_slots=40,
+                        location='معمل الحاسوب',
+                        start_date=datetime.now() + timedelta(days=12),
+                        end_date=datetime.now() + timedelta(days=42)
+                    )
+                ]
+                for activity in default_activities:
+                    db.session.add(activity)
+                db.session.commit()
+                print("✅ Default activities created successfully!")
+    ensure_heartbeat_table(db.engine)
 
 # ==================== AUTH ENDPOINTS ====================
 
+@app.route('/api/tenants', methods=['GET'])
+def get_tenants():
+    """Get the campuses users can sign in to"""
+    return jsonify({'success': True, 'tenants': tenant_names(), 'default': default_tenant()}), 200
+
 @app.route('/api/auth/register', methods=['POST'])
+@priority('critical')
 def register():
     """Register a new user (student or employee)"""
     try:
@@ -128,6 +215,8 @@ def register():
         
         db.session.add(new_user)
         db.session.commit()
+        # A replica may not have the new user yet
+        note_write(new_user.id)
         
         return jsonify({
             'success': True,
@@ -139,6 +228,7 @@ def register():
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
+@priority('critical')
 def login():
     """Login user and return JWT token"""
     try:
@@ -156,6 +246,7 @@ def login():
         
         # Create JWT token
         access_token = create_access_token(identity=user.id)
+        note_write(user.id)
         
         return jsonify({
             'success': True,
@@ -165,123 +256,257 @@ def login():
                 'fullName': user.full_name,
                 'username': user.username,
                 'email': user.email,
-                'role': user.role
+                'role': user.role,
+                'tenant': user.tenant_id
             }
         }), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
+@app.route('/api/auth/logout', methods=['POST'])
+@priority('critical')
+@jwt_required()
+def logout():
+    """Revoke the token used for this request"""
+    try:
+        revoked = revoke_token(get_jwt(), reason='logout')
+        db.session.commit()
+        revocation_cache().add_local(revoked)
+        
+        return jsonify({'success': True, 'message': 'تم تسجيل الخروج بنجاح'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/auth/change-password', methods=['PUT'])
+@priority('critical')
+@jwt_required()
+def change_password():
+    """Change the password, revoke every existing token and return a new one"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        data = request.get_json()
+        
+        if not user:
+            return jsonify({'success': False, 'message': 'المستخدم غير موجود'}), 404
+        
+        if not data or not all(field in data for field in ['currentPassword', 'newPassword']):
+            return jsonify({'success': False, 'message': 'جميع الحقول مطلوبة'}), 400
+        
+        if not check_password_hash(user.password_hash, data['currentPassword']):
+            return jsonify({'success': False, 'message': 'كلمة المرور الحالية غير صحيحة'}), 401
+        
+        user.password_hash = generate_password_hash(data['newPassword'])
+        revoked = revoke_user_tokens(user.id, reason='password_change')
+        db.session.commit()
+        revocation_cache().add_local(revoked)
+        
+        return jsonify({
+            'success': True,
+            'message': 'تم تغيير كلمة المرور بنجاح',
+            'token': create_access_token(identity=user.id)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/auth/account', methods=['DELETE'])
+@priority('critical')
+@jwt_required()
+def delete_account():
+    """Delete the current user's account and revoke all of their tokens"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        data = request.get_json(silent=True) or {}
+        
+        if not user:
+            return jsonify({'success': False, 'message': 'المستخدم غير موجود'}), 404
+        
+        if not check_password_hash(user.password_hash, data.get('password', '')):
+            return jsonify({'success': False, 'message': 'كلمة المرور غير صحيحة'}), 401
+        
+        revoked = revoke_user_tokens(user.id, reason='account_removed')
+        
+        # Free the seats held by the user's registrations
+        for registration in user.activity_registrations.filter(
+            ActivityRegistration.status != RegistrationStatus.CANCELLED
+        ):
+            registration.activity.registered_count = max(0, (registration.activity.registered_count or 0) - 1)
+        
+        Notification.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        IdempotencyKey.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        for employee_request in EmployeeRequest.query.filter(
+            (EmployeeRequest.employee_id == user.id) | (EmployeeRequest.student_id == user.id)
+        ):
+            db.session.delete(employee_request)
+        
+        # Applications and registrations are removed by the relationship cascade
+        db.session.delete(user)
+        db.session.commit()
+        revocation_cache().add_local(revoked)
+        
+        return jsonify({'success': True, 'message': 'تم حذف الحساب بنجاح'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
 # ==================== ACTIVITY ENDPOINTS ====================
 
 @app.route('/api/activities', methods=['GET'])
 @jwt_required()
+@read_only
 def get_activities():
-    """Get all activities with registration status"""
+    """Get all activities with registration status (or only changes with ?since=<watermark>)"""
     try:
         user_id = get_jwt_identity()
-        activities = Activity.query.filter_by(is_active=True).all()
         
-        result = []
-        for activity in activities:
-            # Check if user is registered
-            registration = ActivityRegistration.query.filter_by(
-                activity_id=activity.id,
-                user_id=user_id
-            ).first()
-            
-            result.append({
-                'id': activity.id,
-                'name': activity.name,
-                'description': activity.description,
-                'category': activity.category,
-                'availableSlots': activity.available_slots,
-                'registeredCount': activity.registered_count,
-                'location': activity.location,
-                'startDate': activity.start_date.isoformat() if activity.start_date else None,
-                'endDate': activity.end_date.isoformat() if activity.end_date else None,
-                'isRegistered': registration is not None,
-                'registrationStatus': registration.status if registration else None
-            })
+        try:
+            since = parse_since(request.args.get('since'))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'قيمة since غير صالحة'}), 400
         
-        return jsonify({'success': True, 'activities': result}), 200
+        watermark = new_watermark()
+        
+        # The user's registrations, by activity
+        registrations = ActivityRegistration.query.filter_by(user_id=user_id)
+        
+        if since:
+            # Activities that changed, or whose registration by this user changed
+            changed_registrations = db.session.query(ActivityRegistration.activity_id).filter(
+                ActivityRegistration.user_id == user_id,
+                ActivityRegistration.updated_at > since
+            )
+            activities = Activity.query.filter(
+                (Activity.updated_at > since) | Activity.id.in_(changed_registrations)
+            ).all()
+            registrations = registrations.filter(ActivityRegistration.activity_id.in_([a.id for a in activities]))
+            entries = [activity_entry(activity) for activity in activities]
+        else:
+            entries = active_catalog()
+        
+        registrations = {reg.activity_id: reg for reg in registrations}
+        result, deleted = catalog_items(entries, registrations)
+        
+        response = {'success': True, 'activities': result, 'watermark': watermark, 'full': since is None}
+        if since:
+            response['deleted'] = deleted + deleted_ids('activities', since)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/activities/<int:activity_id>/register', methods=['POST'])
+@priority('critical')
 @jwt_required()
+@idempotent
 def register_for_activity(activity_id):
     """Register user for an activity"""
     try:
         user_id = get_jwt_identity()
+        conflict_policy = app.config['REGISTRATION_CONFLICT_POLICY']
         
-        # Check if activity exists
-        activity = Activity.query.get(activity_id)
-        if not activity:
-            return jsonify({'success': False, 'message': 'النشاط غير موجود'}), 404
-        
-        # Check if activity is full
-        if activity.registered_count >= activity.available_slots:
-            return jsonify({'success': False, 'message': 'النشاط ممتلئ'}), 400
-        
-        # Check if already registered
-        existing = ActivityRegistration.query.filter_by(
-            activity_id=activity_id,
-            user_id=user_id
-        ).first()
-        
-        if existing:
-            return jsonify({'success': False, 'message': 'أنت مسجل بالفعل في هذا النشاط'}), 400
-        
-        # Create registration
-        registration = ActivityRegistration(
-            activity_id=activity_id,
-            user_id=user_id,
-            status='مسجل'
-        )
-        
-        # Update activity registered count
-        activity.registered_count += 1
+        def register_intent():
+            # Check if activity exists
+            activity = Activity.query.get(activity_id)
+            if not activity:
+                return {'success': False, 'message': 'النشاط غير موجود'}, 404
+            
+            # Check if already registered
+            existing = ActivityRegistration.query.filter_by(
+                activity_id=activity_id,
+                user_id=user_id
+            ).first()
+            
+            if existing:
+                return {'success': False, 'message': 'أنت مسجل بالفعل في هذا النشاط'}, 400
+            
+            # Check for schedule conflicts with the user's other registrations
+            conflicts = find_conflicts(user_id, activity.start_date, activity.end_date, exclude_activity_id=activity_id)
+            if conflicts and conflict_policy == 'reject':
+                return {
+                    'success': False,
+                    'message': 'يتعارض موعد هذا النشاط مع نشاط مسجل فيه',
+                    'conflicts': [schedule_entry(other) for other in conflicts]
+                }, 409
+            
+            # Reserve a seat in the database, so concurrent requests (in any
+            # process) cannot all pass a capacity check read before the update
+            reserved = db.session.execute(
+                update(Activity)
+                .where(Activity.id == activity_id, Activity.registered_count < Activity.available_slots)
+                .values(registered_count=Activity.registered_count + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not reserved:
+                return {'success': False, 'message': 'النشاط ممتلئ'}, 400
+            
+            # Create registration
+            registration = ActivityRegistration(
+                activity_id=activity_id,
+                user_id=user_id,
+                status=RegistrationStatus.REGISTERED
+            )
+            record_registration(activity)
+            
+            db.session.add(registration)
+            db.session.flush()
+            
+            return {
+                'success': True,
+                'message': 'تم التسجيل في النشاط بنجاح',
+                'conflicts': [schedule_entry(other) for other in conflicts]
+            }, 200
         
-        db.session.add(registration)
-        db.session.commit()
+        body, status = run_write(register_intent)
+        if status == 200:
+            invalidate_roster(activity_id)
         
-        return jsonify({
-            'success': True,
-            'message': 'تم التسجيل في النشاط بنجاح'
-        }), 200
+        return jsonify(body), status
         
+    except IntegrityError:
+        # A concurrent request registered the same user first
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'أنت مسجل بالفعل في هذا النشاط'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/activities/my-registrations', methods=['GET'])
 @jwt_required()
+@read_only
 def get_my_registrations():
     """Get user's activity registrations"""
     try:
         user_id = get_jwt_identity()
         
-        registrations = ActivityRegistration.query.filter_by(user_id=user_id).all()
+        return jsonify({'success': True, 'registrations': my_registrations(user_id)}), 200
         
-        result = []
-        for reg in registrations:
-            activity = Activity.query.get(reg.activity_id)
-            result.append({
-                'id': reg.id,
-                'activity': {
-                    'id': activity.id,
-                    'name': activity.name,
-                    'description': activity.description,
-                    'category': activity.category,
-                    'location': activity.location
-                },
-                'status': reg.status,
-                'registeredAt': reg.registered_at.isoformat()
-            })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/student/timetable', methods=['GET'])
+@jwt_required()
+@read_only
+def get_student_timetable():
+    """Get the user's conflict-free timetable and any overlapping registrations"""
+    try:
+        user_id = get_jwt_identity()
+        
+        timetable, conflicts, unscheduled = build_timetable(load_student_activities(user_id))
         
-        return jsonify({'success': True, 'registrations': result}), 200
+        return jsonify({
+            'success': True,
+            'timetable': [schedule_entry(activity) for activity in timetable],
+            'conflicts': [[schedule_entry(activity) for activity in group] for group in conflicts],
+            'unscheduled': [schedule_entry(activity) for activity in unscheduled]
+        }), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
@@ -289,7 +514,9 @@ def get_my_registrations():
 # ==================== APPLICATION ENDPOINTS ====================
 
 @app.route('/api/applications/submit', methods=['POST'])
+@priority('critical')
 @jwt_required()
+@idempotent
 def submit_application():
     """Submit a new application"""
     try:
@@ -301,34 +528,40 @@ def submit_application():
         if not all(field in data for field in required_fields):
             return jsonify({'success': False, 'message': 'جميع الحقول مطلوبة'}), 400
         
-        # Get user info
-        user = User.query.get(user_id)
-        
-        # Create new application
-        new_application = Application(
-            user_id=user_id,
-            student_name=data.get('name', user.full_name),
-            activity_type=data['activityType'],
-            activity_number=data['activityNumber'],
-            college=data['college'],
-            department=data['department'],
-            specialization=data['specialization'],
-            phone=data['phone'],
-            details=data.get('details', ''),
-            status='قيد الانتظار'
-        )
+        def submit_intent():
+            # Get user info
+            user = User.query.get(user_id)
+            
+            # Create new application
+            new_application = Application(
+                user_id=user_id,
+                student_name=data.get('name', user.full_name),
+                activity_type=data['activityType'],
+                activity_number=data['activityNumber'],
+                college=data['college'],
+                department=data['department'],
+                specialization=data['specialization'],
+                phone=data['phone'],
+                details=data.get('details', ''),
+                status=ApplicationStatus.PENDING
+            )
+            
+            db.session.add(new_application)
+            record_application_submitted(new_application)
+            db.session.flush()
+            
+            return {
+                'success': True,
+                'message': 'تم إرسال الطلب بنجاح',
+                'application': {
+                    'id': new_application.id,
+                    'status': label(new_application.status)
+                }
+            }, 201
         
-        db.session.add(new_application)
-        db.session.commit()
+        body, status = run_write(submit_intent)
         
-        return jsonify({
-            'success': True,
-            'message': 'تم إرسال الطلب بنجاح',
-            'application': {
-                'id': new_application.id,
-                'status': new_application.status
-            }
-        }), 201
+        return jsonify(body), status
         
     except Exception as e:
         db.session.rollback()
@@ -336,38 +569,23 @@ def submit_application():
 
 @app.route('/api/applications/my-applications', methods=['GET'])
 @jwt_required()
+@read_only
 def get_my_applications():
     """Get current user's applications"""
     try:
         user_id = get_jwt_identity()
-        applications = Application.query.filter_by(user_id=user_id).order_by(Application.submitted_at.desc()).all()
-        
-        result = []
-        for app in applications:
-            result.append({
-                'id': app.id,
-                'studentName': app.student_name,
-                'activityType': app.activity_type,
-                'activityNumber': app.activity_number,
-                'college': app.college,
-                'department': app.department,
-                'specialization': app.specialization,
-                'phone': app.phone,
-                'details': app.details,
-                'status': app.status,
-                'submittedAt': app.submitted_at.isoformat(),
-                'updatedAt': app.updated_at.isoformat()
-            })
         
-        return jsonify({'success': True, 'applications': result}), 200
+        return jsonify({'success': True, 'applications': my_applications(user_id)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/applications/all', methods=['GET'])
+@priority('low')
 @jwt_required()
+@read_only
 def get_all_applications():
-    """Get all applications (employee only)"""
+    """Get all applications, or only changes with ?since=<watermark> (employee only)"""
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -375,26 +593,28 @@ def get_all_applications():
         if user.role != 'employee':
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
-        applications = Application.query.order_by(Application.submitted_at.desc()).all()
+        try:
+            since = parse_since(request.args.get('since'))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'قيمة since غير صالحة'}), 400
+        
+        watermark = new_watermark()
+        
+        if since:
+            result = [
+                application.to_dict()
+                for application in Application.query.filter(
+                    Application.updated_at > since
+                ).order_by(Application.submitted_at.desc())
+            ]
+        else:
+            result = all_applications(user_id)
         
-        result = []
-        for app in applications:
-            result.append({
-                'id': app.id,
-                'studentName': app.student_name,
-                'activityType': app.activity_type,
-                'activityNumber': app.activity_number,
-                'college': app.college,
-                'department': app.department,
-                'specialization': app.specialization,
-                'phone': app.phone,
-                'details': app.details,
-                'status': app.status,
-                'submittedAt': app.submitted_at.isoformat(),
-                'updatedAt': app.updated_at.isoformat()
-            })
+        response = {'success': True, 'applications': result, 'watermark': watermark, 'full': since is None}
+        if since:
+            response['deleted'] = deleted_ids('applications', since)
         
-        return jsonify({'success': True, 'applications': result}), 200
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
@@ -411,23 +631,33 @@ def update_application_status(application_id):
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
         data = request.get_json()
-        new_status = data.get('status')
         
-        if not new_status:
+        if not data.get('status'):
             return jsonify({'success': False, 'message': 'الحالة مطلوبة'}), 400
         
+        try:
+            new_status = parse_status(ApplicationStatus, data['status'])
+        except ValueError:
+            return jsonify({'success': False, 'message': 'الحالة غير صالحة'}), 400
+        
         application = Application.query.get(application_id)
         if not application:
             return jsonify({'success': False, 'message': 'الطلب غير موجود'}), 404
         
+        if not can_transition(application.status, new_status):
+            return jsonify({'success': False, 'message': 'لا يمكن تغيير حالة الطلب إلى هذه الحالة'}), 409
+        
+        old_status = application.status
         application.status = new_status
         application.updated_at = datetime.utcnow()
+        record_application_status_change(application, old_status)
+        enqueue('notify_application_status', {'application_id': application.id})
         
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': f'تم {new_status} الطلب بنجاح'
+            'message': f'تم {label(new_status)} الطلب بنجاح'
         }), 200
         
     except Exception as e:
@@ -435,7 +665,9 @@ def update_application_status(application_id):
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/applications/statistics', methods=['GET'])
+@priority('low')
 @jwt_required()
+@read_only
 def get_statistics():
     """Get application statistics (employee only)"""
     try:
@@ -445,28 +677,70 @@ def get_statistics():
         if user.role != 'employee':
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
-        total = Application.query.count()
-        pending = Application.query.filter_by(status='قيد الانتظار').count()
-        approved = Application.query.filter_by(status='مقبول').count()
-        rejected = Application.query.filter_by(status='مرفوض').count()
+        return jsonify({'success': True, 'statistics': application_statistics(user_id)}), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+# ==================== ANALYTICS ENDPOINTS ====================
+
+@app.route('/api/analytics/participation', methods=['GET'])
+@priority('low')
+@jwt_required()
+@read_only
+def get_participation_analytics():
+    """Get time-bucketed participation and approval rates (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        dimension = request.args.get('dimension', 'college')
+        bucket = request.args.get('bucket', 'day')
+        if dimension not in DIMENSIONS or bucket not in BUCKETS:
+            return jsonify({'success': False, 'message': 'معاملات غير صالحة'}), 400
+        
+        try:
+            start = datetime.fromisoformat(request.args['from']).date() if request.args.get('from') else None
+            end = datetime.fromisoformat(request.args['to']).date() if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'success': False, 'message': 'تنسيق التاريخ غير صالح'}), 400
         
         return jsonify({
             'success': True,
-            'statistics': {
-                'total': total,
-                'pending': pending,
-                'approved': approved,
-                'rejected': rejected
-            }
+            'analytics': participation(dimension, bucket, start, end)
         }), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
+@app.route('/api/analytics/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_participation_analytics():
+    """Queue a full rebuild of the analytics rollups (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        enqueue('rebuild_participation_rollups')
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'تمت جدولة إعادة بناء الإحصائيات'}), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
 # ==================== EMPLOYEE REQUEST ENDPOINTS ====================
 
 @app.route('/api/employee/requests/send', methods=['POST'])
 @jwt_required()
+@idempotent
 def send_employee_request():
     """Send a request from employee to student(s)"""
     try:
@@ -501,10 +775,12 @@ def send_employee_request():
             activity_name=data.get('activityName'),
             activity_code=data.get('activityCode'),
             deadline=deadline,
-            status='قيد الانتظار'
+            status=RequestStatus.PENDING
         )
         
         db.session.add(new_request)
+        db.session.flush()
+        enqueue('notify_employee_request', {'request_id': new_request.id})
         db.session.commit()
         
         return jsonify({
@@ -519,6 +795,7 @@ def send_employee_request():
 
 @app.route('/api/employee/requests/my-requests', methods=['GET'])
 @jwt_required()
+@read_only
 def get_employee_sent_requests():
     """Get employee's sent requests"""
     try:
@@ -528,19 +805,16 @@ def get_employee_sent_requests():
         if user.role != 'employee':
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
-        requests = EmployeeRequest.query.filter_by(employee_id=user_id).order_by(EmployeeRequest.created_at.desc()).all()
-        
-        result = [req.to_dict() for req in requests]
-        
-        return jsonify({'success': True, 'requests': result}), 200
+        return jsonify({'success': True, 'requests': sent_requests(user_id)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/student/requests', methods=['GET'])
 @jwt_required()
+@read_only
 def get_student_requests():
-    """Get student's received requests from employees"""
+    """Get student's received requests from employees (or only changes with ?since=<watermark>)"""
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -548,14 +822,40 @@ def get_student_requests():
         if user.role != 'student':
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
-        # Get requests specifically for this student OR general requests (student_id is null)
-        requests = EmployeeRequest.query.filter(
+        try:
+            since = parse_since(request.args.get('since'))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'قيمة since غير صالحة'}), 400
+        
+        watermark = new_watermark()
+        
+        if not since:
+            # Requests specifically for this student OR general requests (student_id is null)
+            result = received_requests(user_id)
+            
+            return jsonify({'success': True, 'requests': result, 'watermark': watermark, 'full': True}), 200
+        
+        # Only rows this student can list; general requests answered by another
+        # student come back as tombstones (see record_withdrawal)
+        changed = EmployeeRequest.query.filter(
+            EmployeeRequest.updated_at > since,
             (EmployeeRequest.student_id == user_id) | (EmployeeRequest.student_id == None)
         ).order_by(EmployeeRequest.created_at.desc()).all()
         
-        result = [req.to_dict() for req in requests]
+        result = [req.to_dict() for req in changed]
+        listed = {req.id for req in changed}
+        deleted = [
+            deleted_id for deleted_id in deleted_ids('employee_requests', since, user_id)
+            if deleted_id not in listed
+        ]
         
-        return jsonify({'success': True, 'requests': result}), 200
+        return jsonify({
+            'success': True,
+            'requests': result,
+            'deleted': deleted,
+            'watermark': watermark,
+            'full': False
+        }), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
@@ -572,10 +872,14 @@ def respond_to_employee_request(request_id):
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
         data = request.get_json()
-        new_status = data.get('status')
         response_message = data.get('responseMessage', '')
         
-        if not new_status or new_status not in ['مقبول', 'مرفوض']:
+        try:
+            new_status = parse_status(RequestStatus, data.get('status'))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'الحالة غير صالحة'}), 400
+        
+        if new_status not in (RequestStatus.APPROVED, RequestStatus.REJECTED):
             return jsonify({'success': False, 'message': 'الحالة غير صالحة'}), 400
         
         employee_request = EmployeeRequest.query.get(request_id)
@@ -586,21 +890,33 @@ def respond_to_employee_request(request_id):
         if employee_request.student_id and employee_request.student_id != user_id:
             return jsonify({'success': False, 'message': 'غير مصرح لك بالرد على هذا الطلب'}), 403
         
+        # Expired requests are terminal
+        if employee_request.status == RequestStatus.EXPIRED or (
+            employee_request.deadline and employee_request.deadline < datetime.utcnow()
+        ):
+            return jsonify({'success': False, 'message': 'انتهت المهلة المحددة لهذا الطلب'}), 400
+        
+        if not can_transition(employee_request.status, new_status):
+            return jsonify({'success': False, 'message': 'تم الرد على هذا الطلب مسبقاً'}), 409
+        
         # Update request status
         employee_request.status = new_status
         employee_request.response_message = response_message
         employee_request.updated_at = datetime.utcnow()
         employee_request.responded_at = datetime.utcnow()
         
-        # If it was a general request, associate it with this student
+        # If it was a general request, associate it with this student; it
+        # leaves every other student's list
         if not employee_request.student_id:
+            record_withdrawal(employee_request)
             employee_request.student_id = user_id
         
+        enqueue('notify_request_response', {'request_id': employee_request.id})
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': f'تم {new_status} الطلب بنجاح'
+            'message': f'تم {label(new_status)} الطلب بنجاح'
         }), 200
         
     except Exception as e:
@@ -608,7 +924,9 @@ def respond_to_employee_request(request_id):
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
 @app.route('/api/employee/requests/statistics', methods=['GET'])
+@priority('low')
 @jwt_required()
+@read_only
 def get_employee_request_statistics():
     """Get employee request statistics"""
     try:
@@ -618,20 +936,7 @@ def get_employee_request_statistics():
         if user.role != 'employee':
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
-        total = EmployeeRequest.query.filter_by(employee_id=user_id).count()
-        pending = EmployeeRequest.query.filter_by(employee_id=user_id, status='قيد الانتظار').count()
-        approved = EmployeeRequest.query.filter_by(employee_id=user_id, status='مقبول').count()
-        rejected = EmployeeRequest.query.filter_by(employee_id=user_id, status='مرفوض').count()
-        
-        return jsonify({
-            'success': True,
-            'statistics': {
-                'total': total,
-                'pending': pending,
-                'approved': approved,
-                'rejected': rejected
-            }
-        }), 200
+        return jsonify({'success': True, 'statistics': request_statistics(user_id)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
@@ -639,7 +944,9 @@ def get_employee_request_statistics():
 # ==================== EMPLOYEE ENDPOINTS ====================
 
 @app.route('/api/employee/activities', methods=['GET'])
+@priority('low')
 @jwt_required()
+@read_only
 def get_employee_activities():
     """Get all activities with registration details (employee only)"""
     try:
@@ -649,38 +956,7 @@ def get_employee_activities():
         if user.role != 'employee':
             return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
         
-        activities = Activity.query.all()
-        
-        result = []
-        for activity in activities:
-            registrations = ActivityRegistration.query.filter_by(activity_id=activity.id).all()
-            
-            student_list = []
-            for reg in registrations:
-                student = User.query.get(reg.user_id)
-                student_list.append({
-                    'id': student.id,
-                    'name': student.full_name,
-                    'email': student.email,
-                    'registeredAt': reg.registered_at.isoformat(),
-                    'status': reg.status
-                })
-            
-            result.append({
-                'id': activity.id,
-                'name': activity.name,
-                'description': activity.description,
-                'category': activity.category,
-                'availableSlots': activity.available_slots,
-                'registeredCount': activity.registered_count,
-                'location': activity.location,
-                'startDate': activity.start_date.isoformat() if activity.start_date else None,
-                'endDate': activity.end_date.isoformat() if activity.end_date else None,
-                'isActive': activity.is_active,
-                'students': student_list
-            })
-        
-        return jsonify({'success': True, 'activities': result}), 200
+        return jsonify({'success': True, 'activities': employee_activities(user_id)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
@@ -743,6 +1019,296 @@ def add_activity():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
 
+@app.route('/api/employee/activities/<int:activity_id>/checkin', methods=['POST'])
+@priority('critical')
+@jwt_required()
+def check_in_attendance(activity_id):
+    """Record attendance scans, a single userId or a userIds batch (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        data = request.get_json() or {}
+        scanned = data.get('userIds', [data['userId']] if 'userId' in data else [])
+        
+        if not scanned or not isinstance(scanned, list) or not all(isinstance(value, int) and not isinstance(value, bool) for value in scanned):
+            return jsonify({'success': False, 'message': 'معرفات الطلاب مطلوبة'}), 400
+        
+        if len(scanned) > 5000:
+            return jsonify({'success': False, 'message': 'عدد كبير جداً من المعرفات في طلب واحد'}), 400
+        
+        if not db.session.get(Activity, activity_id):
+            return jsonify({'success': False, 'message': 'النشاط غير موجود'}), 404
+        
+        checked_in, already, not_registered = check_in(activity_id, scanned)
+        
+        return jsonify({
+            'success': True,
+            'checkedIn': checked_in,
+            'alreadyCheckedIn': already,
+            'notRegistered': not_registered
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/employee/activities/<int:activity_id>/checkin/close', methods=['POST'])
+@jwt_required()
+def close_attendance(activity_id):
+    """Close check-in and mark everyone who did not attend as absent (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        if not db.session.get(Activity, activity_id):
+            return jsonify({'success': False, 'message': 'النشاط غير موجود'}), 404
+        
+        attended, absent = close_check_in(activity_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'تم إغلاق تسجيل الحضور',
+            'attended': attended,
+            'absent': absent
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+# ==================== JOB QUEUE ENDPOINTS ====================
+
+@app.route('/api/jobs/metrics', methods=['GET'])
+@priority('low')
+@jwt_required()
+def get_job_metrics():
+    """Get background job queue depth and latency (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        return jsonify({'success': True, 'metrics': queue_metrics()}), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+# ==================== DASHBOARD ENDPOINTS ====================
+
+@app.route('/api/employee/dashboard', methods=['GET'])
+@jwt_required()
+@read_only
+def get_employee_dashboard():
+    """Get everything the employee dashboard shows on load (select parts with ?fields=)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        try:
+            selected = parse_fields(request.args.get('fields'), EMPLOYEE_SECTIONS)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'قيمة fields غير صالحة'}), 400
+        
+        return jsonify({'success': True, **build_dashboard(EMPLOYEE_SECTIONS, selected, user.id)}), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/student/dashboard', methods=['GET'])
+@jwt_required()
+@read_only
+def get_student_dashboard():
+    """Get everything the student dashboard shows on load (select parts with ?fields=)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'student':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        try:
+            selected = parse_fields(request.args.get('fields'), STUDENT_SECTIONS)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'قيمة fields غير صالحة'}), 400
+        
+        return jsonify({'success': True, **build_dashboard(STUDENT_SECTIONS, selected, user.id)}), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+# ==================== CROSS-TENANT ADMIN ENDPOINTS ====================
+
+def is_tenant_admin(user):
+    """Allowlisted employees of the admin tenant may query every campus
+
+    The employee role is chosen at sign-up, so it is not enough on its own.
+    """
+    admins = {name.strip() for name in app.config['TENANT_ADMIN_USERNAMES'].split(',') if name.strip()}
+    return (
+        user.role == 'employee'
+        and user.username in admins
+        and current_tenant() == app.config['TENANT_ADMIN_TENANT']
+    )
+
+@app.route('/api/admin/tenants/statistics', methods=['GET'])
+@priority('low')
+@jwt_required()
+def get_tenant_statistics():
+    """Get user, activity and application counts of every campus and their totals"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not is_tenant_admin(user):
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        results = fan_out(tenant_overview)
+        
+        tenants = {name: result for name, result in results.items() if not isinstance(result, Exception)}
+        totals = {}
+        for overview in tenants.values():
+            for key, value in overview.items():
+                totals[key] = totals.get(key, 0) + value
+        
+        return jsonify({
+            'success': True,
+            'tenants': tenants,
+            'totals': totals,
+            'unavailable': sorted(name for name, result in results.items() if isinstance(result, Exception))
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/admin/tenants/applications', methods=['GET'])
+@priority('low')
+@jwt_required()
+def get_tenant_applications():
+    """Get the most recent applications across every campus (?limit=, ?status=)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not is_tenant_admin(user):
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        status = None
+        if request.args.get('status'):
+            try:
+                status = parse_status(ApplicationStatus, request.args['status'])
+            except ValueError:
+                return jsonify({'success': False, 'message': 'الحالة غير صالحة'}), 400
+        
+        results = fan_out(recent_applications, limit, status)
+        
+        merged = []
+        for name, result in results.items():
+            if not isinstance(result, Exception):
+                merged.extend(dict(application, tenant=name) for application in result)
+        merged.sort(key=lambda application: application['submittedAt'], reverse=True)
+        
+        return jsonify({
+            'success': True,
+            'applications': merged[:limit],
+            'unavailable': sorted(name for name, result in results.items() if isinstance(result, Exception))
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+# ==================== PROFILING ENDPOINTS ====================
+
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+@priority('exempt')
+@jwt_required()
+def profiling_control():
+    """Get or change request profiling settings for this worker (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            
+            if data.get('enabled'):
+                try:
+                    profiling.enable(
+                        db.engines.values(),
+                        endpoint=data.get('endpoint'),
+                        sample_rate=data.get('sampleRate', 1.0),
+                        interval_ms=data.get('intervalMs', 5)
+                    )
+                except (TypeError, ValueError):
+                    return jsonify({'success': False, 'message': 'إعدادات غير صالحة'}), 400
+            else:
+                profiling.disable()
+        
+        return jsonify({'success': True, 'profiling': profiling.status()}), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/admin/profiling/profiles', methods=['GET', 'DELETE'])
+@priority('exempt')
+@jwt_required()
+def profiling_profiles():
+    """List stored request profiles with SQL timings, or clear them (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        if request.method == 'DELETE':
+            profiling.clear()
+            return jsonify({'success': True, 'message': 'تم حذف الملفات'}), 200
+        
+        return jsonify({
+            'success': True,
+            'profiles': profiling.profile_summaries(request.args.get('endpoint'))
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
+@app.route('/api/admin/profiling/flamegraph', methods=['GET'])
+@priority('exempt')
+@jwt_required()
+def profiling_flamegraph():
+    """Download aggregated collapsed stacks for flamegraph tools (employee only)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'employee':
+            return jsonify({'success': False, 'message': 'غير مصرح لك'}), 403
+        
+        return Response(
+            profiling.collapsed_stacks(request.args.get('endpoint')),
+            mimetype='text/plain',
+            headers={'Content-Disposition': 'attachment; filename=profile.collapsed'}
+        )
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'حدث خطأ: {str(e)}'}), 500
+
 # ==================== FRONTEND ROUTES ====================
 
 @app.route('/')
@@ -758,14 +1324,33 @@ def serve_static(path):
 # ==================== HEALTH CHECK ====================
 
 @app.route('/api/health', methods=['GET'])
+@app.route('/api/health/live', methods=['GET'])
+@priority('exempt')
 def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up and serving requests"""
     return jsonify({
         'status': 'healthy',
         'message': 'University Activities Backend API is running',
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+@app.route('/api/health/ready', methods=['GET'])
+@priority('exempt')
+def readiness_check():
+    """Readiness check: every tenant's database answers and the worker is not saturated"""
+    ready, report = readiness({name: tenant_engine(name) for name in tenant_names()}, load_shedder)
+    return jsonify({
+        'status': 'ready' if ready else 'unavailable',
+        'timestamp': datetime.utcnow().isoformat(),
+        **report
+    }), 200 if ready else 503
+
+@app.route('/api/health/shedding', methods=['GET'])
+@priority('exempt')
+def shedding_metrics():
+    """Load shedding counters for this worker"""
+    return jsonify({'success': True, 'shedding': load_shedder.metrics()}), 200
+
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
@@ -790,6 +1375,34 @@ def get_local_ip():
     except:
         return "localhost"
 
+def schedule_entry(activity):
+    """Serialize an activity for timetable and conflict responses"""
+    return {
+        'id': activity.id,
+        'name': activity.name,
+        'category': activity.category,
+        'location': activity.location,
+        'startDate': activity.start_date.isoformat() if activity.start_date else None,
+        'endDate': activity.end_date.isoformat() if activity.end_date else None
+    }
+
+def tenant_overview():
+    """Row counts of the current tenant's database"""
+    return {
+        'students': User.query.filter_by(role='student').count(),
+        'employees': User.query.filter_by(role='employee').count(),
+        'activeActivities': Activity.query.filter_by(is_active=True).count(),
+        'applications': Application.query.count(),
+        'pendingApplications': Application.query.filter_by(status=ApplicationStatus.PENDING).count()
+    }
+
+def recent_applications(limit, status=None):
+    """Latest applications of the current tenant's database"""
+    query = Application.query
+    if status is not None:
+        query = query.filter_by(status=status)
+    return [application.to_dict() for application in query.order_by(Application.submitted_at.desc()).limit(limit)]
+
 def open_browser_delayed(url, delay=2):
     """Open browser after delay"""
     time.sleep(delay)
@@ -808,6 +1421,8 @@ if __name__ == '__main__':
     print("=" * 70)
     print("   🎓 نظام إدارة الأنشطة الطلابية - جامعة العين")
     print("   🎓 University Activities Management System")
+    with app.app_context():
+        print(f"   🏫 {', '.join(tenant_names())}")
     print("=" * 70)
     print()
     print("🚀 Starting server...")
@@ -836,6 +1451,12 @@ if __name__ == '__main__':
     browser_thread.daemon = True
     browser_thread.start()
     
+    # Run background jobs and lifecycle sweeps in-process when no separate worker is deployed
+    if app.config['JOB_INLINE_WORKER']:
+        start_worker_thread(app)
+        start_scheduler_thread(app)
+        start_heartbeat_thread(app)
+    
     try:
         app.run(debug=False, host='0.0.0.0', port=port, threaded=True)
     except OSError as e:
@@ -0,0 +1,218 @@
+"""Bulk attendance check-in for live events.
+
+Each activity's roster (registered and already-attended user ids) is loaded
+once and kept in memory, so scans are validated without touching the
+database. Accepted scans from concurrent requests are coalesced: whichever
+request finds no write in progress becomes the leader and flushes every
+pending id in one batched UPDATE, while the others wait for that flush.
+
+Rosters are dropped when check-in closes, and any roster left unused for
+``ATTENDANCE_ROSTER_IDLE_TTL`` seconds is evicted on the next lookup, so
+the cache only holds activities with check-in in progress.
+"""
+from flask import current_app, g
+from sqlalchemy import func, update
+from datetime import datetime
+from collections import Counter
+import threading
+import time
+
+from models import db, ActivityRegistration
+from statuses import RegistrationStatus
+
+# Registrations that may still be marked as attended
+CHECKABLE_STATUSES = (RegistrationStatus.REGISTERED, RegistrationStatus.ABSENT)
+
+
+class Roster:
+    """In-memory attendance state of one activity"""
+
+    def __init__(self, activity_id, registered, attended):
+        self.activity_id = activity_id
+        self.registered = registered
+        self.attended = attended
+        self.loaded_at = self.last_used = time.monotonic()
+        self.condition = threading.Condition()
+        self.pending = set()
+        self.flushing = False
+        self.flushed_generation = 0
+        # generation -> requests waiting for it, and the error of a failed one
+        self.waiting = Counter()
+        self.failed_generations = {}
+
+    def idle(self):
+        return not self.flushing and not self.pending and not self.waiting
+
+
+# (tenant bind, activity id) -> Roster
+_rosters = {}
+_rosters_lock = threading.Lock()
+
+
+def _roster_key(activity_id):
+    return (g.get('tenant_bind'), activity_id)
+
+
+def _load_roster(activity_id):
+    rows = db.session.query(ActivityRegistration.user_id, ActivityRegistration.status).filter(
+        ActivityRegistration.activity_id == activity_id,
+        ActivityRegistration.status != RegistrationStatus.CANCELLED
+    ).all()
+    return Roster(
+        activity_id,
+        registered={user_id for user_id, _ in rows},
+        attended={user_id for user_id, status in rows if status == RegistrationStatus.ATTENDED}
+    )
+
+
+def _evict_idle_rosters(now):
+    """Drop rosters unused for longer than the idle TTL; call with the lock held"""
+    max_idle = current_app.config.get('ATTENDANCE_ROSTER_IDLE_TTL', 600)
+    for key, roster in list(_rosters.items()):
+        if now - roster.last_used > max_idle and roster.idle():
+            del _rosters[key]
+
+
+def get_roster(activity_id, reload=False):
+    """Roster of an activity, loaded from the database on first use"""
+    key = _roster_key(activity_id)
+    now = time.monotonic()
+    with _rosters_lock:
+        _evict_idle_rosters(now)
+        roster = _rosters.get(key)
+        if roster is not None:
+            roster.last_used = now
+    if roster is None or reload:
+        fresh = _load_roster(activity_id)
+        with _rosters_lock:
+            if roster is not None:
+                # Keep ids already accepted by this process
+                fresh.attended |= roster.attended
+            roster = _rosters[key] = fresh
+    return roster
+
+
+def invalidate_roster(activity_id):
+    """Drop a cached roster, e.g. after a new registration"""
+    with _rosters_lock:
+        _rosters.pop(_roster_key(activity_id), None)
+
+
+def _write_attended(activity_id, user_ids):
+    """Mark `user_ids` as attended with batched UPDATEs in one transaction"""
+    now = datetime.utcnow()
+    batch_size = current_app.config.get('ATTENDANCE_BATCH_SIZE', 500)
+    ids = sorted(user_ids)
+
+    for offset in range(0, len(ids), batch_size):
+        db.session.execute(
+            update(ActivityRegistration)
+            .where(
+                ActivityRegistration.activity_id == activity_id,
+                ActivityRegistration.user_id.in_(ids[offset:offset + batch_size]),
+                ActivityRegistration.status.in_(CHECKABLE_STATUSES)
+            )
+            .values(status=RegistrationStatus.ATTENDED, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+
+def _flush_coalesced(roster, user_ids):
+    """Queue ids for writing and return once a flush containing them committed"""
+    with roster.condition:
+        roster.pending |= user_ids
+        # A flush already in progress does not contain our ids
+        target = roster.flushed_generation + (2 if roster.flushing else 1)
+        roster.waiting[target] += 1
+
+        while roster.flushed_generation < target:
+            if roster.flushing:
+                roster.condition.wait()
+                continue
+
+            batch, roster.pending = roster.pending, set()
+            roster.flushing = True
+            roster.condition.release()
+            error = None
+            try:
+                if batch:
+                    _write_attended(roster.activity_id, batch)
+            except Exception as e:
+                db.session.rollback()
+                error = e
+            finally:
+                roster.condition.acquire()
+                roster.flushing = False
+                roster.flushed_generation += 1
+                if error is not None and roster.waiting[roster.flushed_generation]:
+                    roster.failed_generations[roster.flushed_generation] = error
+                    roster.attended -= batch
+                roster.condition.notify_all()
+
+        # The last waiter of a generation removes its error
+        roster.waiting[target] -= 1
+        if roster.waiting[target]:
+            error = roster.failed_generations.get(target)
+        else:
+            del roster.waiting[target]
+            error = roster.failed_generations.pop(target, None)
+        if error is not None:
+            raise error
+
+
+def check_in(activity_id, user_ids):
+    """Record attendance scans; returns (checked_in, already_checked_in, not_registered)"""
+    roster = get_roster(activity_id)
+    scanned = set(user_ids)
+
+    # Ids unknown to a roster older than the TTL may be new registrations
+    unknown = scanned - roster.registered
+    ttl = current_app.config.get('ATTENDANCE_ROSTER_TTL', 30)
+    if unknown and time.monotonic() - roster.loaded_at > ttl:
+        roster = get_roster(activity_id, reload=True)
+
+    with roster.condition:
+        not_registered = scanned - roster.registered
+        already = scanned & roster.attended
+        accepted = scanned - not_registered - already
+        roster.attended |= accepted
+
+    if accepted:
+        _flush_coalesced(roster, accepted)
+
+    return sorted(accepted), sorted(already), sorted(not_registered)
+
+
+def close_check_in(activity_id):
+    """Mark every registered user who did not check in as absent, in one statement"""
+    roster = get_roster(activity_id)
+
+    # Wait for any in-flight check-in flush before closing
+    with roster.condition:
+        while roster.flushing:
+            roster.condition.wait()
+        if roster.pending:
+            batch, roster.pending = roster.pending, set()
+            _write_attended(activity_id, batch)
+            roster.flushed_generation += 1
+            roster.condition.notify_all()
+
+    absent = db.session.execute(
+        update(ActivityRegistration)
+        .where(
+            ActivityRegistration.activity_id == activity_id,
+            ActivityRegistration.status == RegistrationStatus.REGISTERED
+        )
+        .values(status=RegistrationStatus.ABSENT, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+
+    # The roster only knows this process's check-ins; other workers write theirs directly
+    attended = db.session.query(func.count(ActivityRegistration.id)).filter(
+        ActivityRegistration.activity_id == activity_id,
+        ActivityRegistration.status == RegistrationStatus.ATTENDED
+    ).scalar()
+    invalidate_roster(activity_id)
+    return attended, absent
@@ -0,0 +1,129 @@
+"""Benchmark: per-request commits vs the group-commit write coalescer.
+
+Runs bursts of concurrent activity registrations and application
+submissions against a temporary SQLite database, with and without
+WRITE_COALESCING, and reports requests per second. The app installs its
+coalescer at startup (with the request hooks it counts in-flight requests
+with); the per-request mode only takes it out of ``app.extensions``.
+
+    python benchmarks/bench_group_commit.py [writers ...]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ['DATABASE_URI'] = f'sqlite:///{os.path.join(_tmp, "bench.db")}'
+os.environ['WRITE_COALESCING'] = 'True'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import app  # noqa: E402
+from models import db, Activity, User  # noqa: E402
+
+APPLICATION = {
+    'activityType': 'رياضي',
+    'activityNumber': '1',
+    'college': 'كلية الهندسة',
+    'department': 'هندسة الحاسوب',
+    'specialization': 'برمجيات',
+    'phone': '0500000000'
+}
+
+
+def make_users(count):
+    with app.app_context():
+        start = User.query.count()
+        users = [
+            User(full_name=f'طالب {i}', username=f'bench{i}', email=f'bench{i}@example.com',
+                 password_hash='x', role='student')
+            for i in range(start, start + count)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return [{'Authorization': f'Bearer {create_access_token(identity=user.id)}'} for user in users]
+
+
+def make_activity(slots):
+    with app.app_context():
+        activity = Activity(name='نشاط اختبار', category='رياضي', available_slots=slots)
+        db.session.add(activity)
+        db.session.commit()
+        return activity.id
+
+
+def burst(headers, request_fn):
+    """Fire one request per writer at once; returns (seconds, status counts)"""
+    barrier = threading.Barrier(len(headers) + 1)
+    statuses = []
+
+    def writer(writer_headers):
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(request_fn(client, writer_headers).status_code)
+
+    threads = [threading.Thread(target=writer, args=(h,)) for h in headers]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return elapsed, counts
+
+
+COALESCER = app.extensions['write_coalescer']
+
+
+def run(writers, coalesced):
+    if coalesced:
+        app.extensions['write_coalescer'] = COALESCER
+    else:
+        app.extensions.pop('write_coalescer', None)
+
+    batches, intents = COALESCER.stats['batches'], COALESCER.stats['intents']
+    headers = make_users(writers)
+    activity_id = make_activity(slots=writers // 2)
+
+    register_time, register_counts = burst(
+        headers, lambda client, h: client.post(f'/api/activities/{activity_id}/register', headers=h)
+    )
+    submit_time, submit_counts = burst(
+        headers, lambda client, h: client.post('/api/applications/submit', headers=h, json=APPLICATION)
+    )
+    batches = COALESCER.stats['batches'] - batches
+    batch_size = (COALESCER.stats['intents'] - intents) / batches if batches else None
+    return writers / register_time, register_counts, writers / submit_time, batch_size
+
+
+def main():
+    writer_counts = [int(arg) for arg in sys.argv[1:]] or [50, 100, 250, 500]
+    app.config['SHED_MAX_IN_FLIGHT'] = 0
+
+    print(f'{"writers":>8}{"mode":>12}{"register/s":>12}{"submit/s":>12}{"batch size":>12}  register outcomes')
+    for writers in writer_counts:
+        baseline = None
+        for coalesced in (False, True):
+            register_rate, register_counts, submit_rate, batch_size = run(writers, coalesced)
+            mode = 'coalesced' if coalesced else 'per-request'
+            batch_size = f'{batch_size:.1f}' if batch_size else '-'
+            print(f'{writers:>8}{mode:>12}{register_rate:>12.0f}{submit_rate:>12.0f}{batch_size:>12}  {register_counts}')
+            if baseline is None:
+                baseline = (register_rate, submit_rate, register_counts)
+            else:
+                # Rates are only comparable when both modes did the same writes
+                if register_counts != baseline[2]:
+                    print(f'{"":>8}{"":>12}  register outcomes differ, speedup not comparable')
+                print(f'{"":>8}{"speedup":>12}{register_rate / baseline[0]:>11.2f}x{submit_rate / baseline[1]:>11.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark: Arabic string status column vs SMALLINT enum column.
+
+Builds two otherwise identical SQLite tables, indexes their status column
+and compares index size and the speed of status-filtered counts.
+
+    python benchmarks/bench_status_encoding.py [rows]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+LABELS = ['قيد الانتظار', 'مقبول', 'مرفوض']
+WEIGHTS = [0.5, 0.35, 0.15]
+
+
+def build(path, rows, as_integer):
+    conn = sqlite3.connect(path)
+    column_type = 'SMALLINT' if as_integer else 'VARCHAR(50)'
+    conn.execute(f'CREATE TABLE applications (id INTEGER PRIMARY KEY, user_id INTEGER, status {column_type} NOT NULL)')
+
+    rng = random.Random(42)
+    values = []
+    for row_id in range(1, rows + 1):
+        index = rng.choices(range(len(LABELS)), WEIGHTS)[0]
+        values.append((row_id, rng.randint(1, rows // 10 + 1), index if as_integer else LABELS[index]))
+    conn.executemany('INSERT INTO applications VALUES (?, ?, ?)', values)
+    conn.commit()
+
+    pages_before = conn.execute('PRAGMA page_count').fetchone()[0]
+    conn.execute('CREATE INDEX ix_applications_status ON applications (status)')
+    conn.commit()
+    pages_after = conn.execute('PRAGMA page_count').fetchone()[0]
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+
+    return conn, (pages_after - pages_before) * page_size
+
+
+def time_counts(conn, keys, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for key in keys:
+            conn.execute('SELECT count(*) FROM applications WHERE status = ?', (key,)).fetchone()
+    return (time.perf_counter() - start) / (repeat * len(keys))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        string_conn, string_index = build(os.path.join(tmp, 'string.db'), rows, as_integer=False)
+        integer_conn, integer_index = build(os.path.join(tmp, 'integer.db'), rows, as_integer=True)
+
+        string_time = time_counts(string_conn, LABELS)
+        integer_time = time_counts(integer_conn, range(len(LABELS)))
+
+        string_conn.close()
+        integer_conn.close()
+
+    print(f'Rows: {rows}')
+    print(f'{"":<22}{"string":>14}{"integer":>14}{"ratio":>10}')
+    print(f'{"status index (KiB)":<22}{string_index / 1024:>14.1f}{integer_index / 1024:>14.1f}'
+          f'{string_index / max(integer_index, 1):>10.2f}')
+    print(f'{"filtered count (ms)":<22}{string_time * 1000:>14.3f}{integer_time * 1000:>14.3f}'
+          f'{string_time / integer_time:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Cross-worker cache coherence through the entity_versions change log.
+
+Every transaction that changes a tracked table also increments that
+table's row in ``entity_versions``, in the same transaction. Tables changed
+by unit-of-work flushes and ORM bulk UPDATE/DELETE statements are recorded
+as they happen and bumped in one statement just before commit, in table
+name order, so the version rows are locked only for the commit and always
+in the same order: concurrent writers cannot deadlock on them. A version
+therefore never moves ahead of the data it describes, on any worker.
+
+``VersionedCache`` entries are stamped with the versions of the tables
+they were built from. Each process polls the (tiny) version table at most
+every ``CACHE_VERSION_POLL_SECONDS`` per tenant, and immediately after its
+own commits, so an entry is rebuilt only once one of its own tables
+changed, within one poll interval of a commit on any worker.
+"""
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+import threading
+import time
+
+from models import db, User, Activity, ActivityRegistration, Application, EmployeeRequest, EntityVersion
+
+# Tables whose changes are counted
+TRACKED_ENTITIES = tuple(model.__tablename__ for model in (
+    User, Activity, ActivityRegistration, Application, EmployeeRequest
+))
+
+# tenant bind -> (polled_at, {entity: version})
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+# ==================== BUMPING ====================
+
+def bump(connection, entities):
+    """Increment the versions of `entities` on `connection`'s transaction"""
+    if entities:
+        connection.execute(
+            update(EntityVersion)
+            .where(EntityVersion.entity.in_(sorted(entities)))
+            .values(version=EntityVersion.version + 1, updated_at=datetime.utcnow())
+        )
+
+
+def _remember(session, connection, entities):
+    # Keyed by connection, so each database's versions are bumped on its own transaction
+    session.info.setdefault('changed_entities', {}).setdefault(connection, set()).update(entities)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed(session, flush_context):
+    entities = {
+        instance.__tablename__
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if getattr(instance, '__tablename__', None) in TRACKED_ENTITIES
+        and (instance in session.new or instance in session.deleted or session.is_modified(instance))
+    }
+    if entities:
+        _remember(session, session.connection(), entities)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    entity = mapper.local_table.name if mapper is not None else None
+    if entity not in TRACKED_ENTITIES:
+        return None
+
+    session = orm_execute_state.session
+    _remember(session, session.connection(bind_arguments=orm_execute_state.bind_arguments), {entity})
+    return None
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_before_commit(session):
+    # Savepoint releases also fire before_commit; only the real commit bumps
+    if session.in_nested_transaction():
+        return
+    # Flush now so changes pending at commit are recorded too
+    session.flush()
+    for connection, entities in session.info.get('changed_entities', {}).items():
+        bump(connection, entities)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_local_versions(session):
+    # Releasing a savepoint also fires after_commit; wait for the real commit
+    if session.in_nested_transaction():
+        return
+    # Entries built before our own commit must not be served after it
+    if session.info.pop('changed_entities', None) and has_app_context():
+        with _versions_lock:
+            _versions.pop(g.get('tenant_bind'), None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_changes(session, transaction):
+    # A savepoint rollback only discards part of the transaction: keep the
+    # entities recorded so far (an extra bump is harmless, a missed one is not)
+    if transaction.parent is None:
+        session.info.pop('changed_entities', None)
+
+
+def ensure_entity_versions():
+    """Create the version rows of the current tenant's database"""
+    existing = {row.entity for row in db.session.query(EntityVersion.entity)}
+    missing = [EntityVersion(entity=entity, version=0) for entity in TRACKED_ENTITIES if entity not in existing]
+    if missing:
+        db.session.add_all(missing)
+        db.session.commit()
+
+
+# ==================== POLLING ====================
+
+def current_versions():
+    """Versions of every tracked table, polled at most once per interval"""
+    key = g.get('tenant_bind')
+    interval = current_app.config.get('CACHE_VERSION_POLL_SECONDS', 1)
+    now = time.monotonic()
+
+    with _versions_lock:
+        cached = _versions.get(key)
+    if cached and now - cached[0] < interval:
+        return cached[1]
+
+    versions = dict(db.session.query(EntityVersion.entity, EntityVersion.version).all())
+    with _versions_lock:
+        _versions[key] = (now, versions)
+    return versions
+
+
+@contextmanager
+def primary_reads():
+    """Load cached data from the primary, where the versions are read from"""
+    replica = g.pop('db_read_bind', None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g.db_read_bind = replica
+
+
+class VersionedCache:
+    """Per-process cache whose entries are invalidated by entity versions"""
+
+    def __init__(self, *entities):
+        self.entities = entities
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def get(self, key, loader):
+        """Cached value for `key`, rebuilt with `loader()` if its tables changed"""
+        full_key = (g.get('tenant_bind'), key)
+
+        with primary_reads():
+            # Stamp with versions read before loading, so a concurrent commit
+            # can only make the entry look older than its data
+            versions = current_versions()
+            stamp = tuple(versions.get(entity, 0) for entity in self.entities)
+
+            with self.lock:
+                entry = self.entries.get(full_key)
+            if entry is not None and entry[0] == stamp:
+                self.stats['hits'] += 1
+                return entry[1]
+
+            self.stats['misses'] += 1
+            value = loader()
+
+        with self.lock:
+            self.entries[full_key] = (stamp, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,205 @@
+"""Opt-in group commit for bursty write endpoints.
+
+Handlers hand the coalescer a write intent: a function that performs its
+writes on ``db.session`` without committing and returns the response body
+and status code. A single committer thread collects intents for a few
+milliseconds, runs each one inside its own SAVEPOINT and commits the whole
+batch in one transaction, so a burst of requests pays for one fsync and
+one acquisition of SQLite's writer lock instead of one per request.
+
+An intent that raises only rolls back its own savepoint; its caller gets
+the exception while the rest of the batch commits. If the batch commit
+fails before reaching the database, its writes are rolled back and every
+intent is retried in its own transaction; if the database may already have
+committed it, the intents fail instead of running twice.
+
+pysqlite does not send BEGIN before a SAVEPOINT, so on SQLite the batch
+opens its transaction explicitly; otherwise each savepoint would be a
+transaction of its own, committed by its RELEASE. Intents
+are batched per tenant, on the database of the request that submitted them.
+
+The coalescer counts the requests in flight in its process and stops
+waiting as soon as every one of them is already in the batch, since no
+other intent can arrive. A single-threaded worker (gunicorn's default sync
+worker) therefore commits at once instead of waiting out the window.
+"""
+from flask import current_app, g
+from sqlalchemy import event
+from concurrent.futures import Future
+from collections import Counter
+import queue
+import threading
+import time
+
+from models import db
+from tenants import default_tenant, tenant_context
+
+
+class WriteCoalescer:
+    """Collects write intents from request threads and commits them in batches"""
+
+    def __init__(self, app):
+        self.app = app
+        self.window = app.config.get('WRITE_COALESCING_WINDOW_MS', 5) / 1000
+        self.max_batch = app.config.get('WRITE_COALESCING_MAX_BATCH', 100)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._active_lock = threading.Lock()
+        self.active_requests = 0
+        self.stats = Counter()
+
+    def _request_started(self):
+        with self._active_lock:
+            self.active_requests += 1
+        g.coalescer_counted = True
+
+    def _request_finished(self, exc=None):
+        if g.pop('coalescer_counted', False):
+            with self._active_lock:
+                self.active_requests -= 1
+
+    def submit(self, intent, timeout=30):
+        """Run `intent` in the next batch and return its result (or raise its error)"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((g.get('tenant'), intent, future))
+        return future.result(timeout=timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-coalescer')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            # Requests not in the batch may still submit; wait only for them
+            if self._queue.empty() and len(batch) >= self.active_requests:
+                self.stats['earlyCommits'] += 1
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batches = {}
+                for tenant, intent, future in self._collect():
+                    batches.setdefault(tenant, []).append((intent, future))
+
+                for tenant, batch in batches.items():
+                    try:
+                        with tenant_context(tenant or default_tenant()):
+                            self._commit_batch(batch)
+                    except Exception as e:
+                        for _, future in batch:
+                            if not future.done():
+                                future.set_exception(e)
+                    finally:
+                        db.session.remove()
+
+    @staticmethod
+    def _begin_batch():
+        """Open the batch's transaction and return its connection"""
+        connection = db.session.connection()
+        dbapi_connection = connection.connection.dbapi_connection
+        if connection.dialect.name == 'sqlite' and not dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN')
+        return connection
+
+    @staticmethod
+    def _still_in_transaction(connection):
+        """Whether the batch's transaction is still open, so a rollback discards it"""
+        try:
+            return connection.connection.dbapi_connection.in_transaction
+        except Exception:
+            return False
+
+    def _commit_batch(self, batch):
+        connection = self._begin_batch()
+        results = []
+        for intent, future in batch:
+            try:
+                with db.session.begin_nested():
+                    results.append((future, intent(), None))
+            except Exception as e:
+                results.append((future, None, e))
+
+        # Set once the COMMIT is sent: from then on the writes may be durable
+        commit_sent = []
+
+        def mark(conn):
+            commit_sent.append(True)
+
+        event.listen(connection, 'commit', mark)
+        try:
+            db.session.commit()
+        except Exception as e:
+            if commit_sent and not self._still_in_transaction(connection):
+                # The database may have committed the batch: never run it twice
+                self.stats['failedCommits'] += 1
+                for future, _, _ in results:
+                    future.set_exception(e)
+                return
+            db.session.rollback()
+            self.stats['fallbacks'] += 1
+            self._commit_individually(batch)
+            return
+        finally:
+            if event.contains(connection, 'commit', mark):
+                event.remove(connection, 'commit', mark)
+
+        self.stats['batches'] += 1
+        self.stats['intents'] += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _commit_individually(self, batch):
+        for intent, future in batch:
+            try:
+                result = intent()
+                db.session.commit()
+                future.set_result(result)
+            except Exception as e:
+                db.session.rollback()
+                future.set_exception(e)
+            self.stats['intents'] += 1
+
+
+def run_write(intent):
+    """Run a write intent, through the app's coalescer when WRITE_COALESCING is on"""
+    coalescer = current_app.extensions.get('write_coalescer')
+    if coalescer is not None:
+        return coalescer.submit(intent)
+
+    try:
+        result = intent()
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def init_coalescer(app):
+    """Install a coalescer on `app` if WRITE_COALESCING is enabled"""
+    if app.config.get('WRITE_COALESCING'):
+        coalescer = WriteCoalescer(app)
+        app.before_request(coalescer._request_started)
+        app.teardown_request(coalescer._request_finished)
+        app.extensions['write_coalescer'] = coalescer
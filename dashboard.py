@@ -0,0 +1,110 @@
+"""Composite dashboard payloads.
+
+Each dashboard is a set of named sections, served by the same functions
+(listings.py) as the separate endpoints a page used to call on load. The
+user is looked up once by the view and only its id is passed to the
+sections.
+
+``?fields=`` keeps the payload lean: ``fields=statistics,applications``
+returns only those sections, and ``fields=applications.id,applications.status``
+also trims each item of a list section to the given keys.
+
+On SQLite the sections run one after another on the request's session
+(its connections cannot serve queries in parallel). On other drivers they
+run concurrently, up to ``DASHBOARD_MAX_WORKERS`` at a time, each on its
+own pooled connection with the same tenant and read bind as the request.
+"""
+from flask import current_app, g
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db
+from tenants import current_tenant, tenant_context
+from listings import (application_statistics, all_applications, my_applications, sent_requests, received_requests,
+                      request_statistics, employee_activities, student_activities, my_registrations)
+
+
+# ==================== SECTIONS ====================
+
+EMPLOYEE_SECTIONS = {
+    'statistics': application_statistics,
+    'applications': all_applications,
+    'sentRequests': sent_requests,
+    'requestStatistics': request_statistics,
+    'activities': employee_activities
+}
+
+STUDENT_SECTIONS = {
+    'activities': student_activities,
+    'registrations': my_registrations,
+    'applications': my_applications,
+    'requests': received_requests
+}
+
+
+# ==================== FIELD SELECTION ====================
+
+def parse_fields(value, sections):
+    """Parse ``?fields=`` into {section: item keys or None}
+
+    Raises ValueError for unknown sections.
+    """
+    if not value:
+        return {name: None for name in sections}
+
+    selected = {}
+    for field in (part.strip() for part in value.split(',')):
+        if not field:
+            continue
+        name, _, key = field.partition('.')
+        if name not in sections:
+            raise ValueError(name)
+        if not key:
+            selected[name] = None
+        elif name not in selected or selected[name] is not None:
+            selected.setdefault(name, set()).add(key)
+    return selected
+
+
+def _trim(data, keys):
+    if keys is None:
+        return data
+    if isinstance(data, list):
+        return [{key: item[key] for key in keys if key in item} for item in data]
+    return {key: data[key] for key in keys if key in data}
+
+
+# ==================== EXECUTION ====================
+
+def _runs_concurrently():
+    bind = g.get('tenant_bind') or g.get('db_read_bind')
+    engine = db.engines[bind] if bind else db.engine
+    return engine.dialect.name != 'sqlite' and current_app.config.get('DASHBOARD_MAX_WORKERS', 4) > 1
+
+
+def _run_in_context(app, tenant, read_bind, section, user_id):
+    # A new app context gets its own scoped session and connection
+    with app.app_context(), tenant_context(tenant):
+        if read_bind:
+            g.db_read_bind = read_bind
+        try:
+            return section(user_id)
+        finally:
+            db.session.remove()
+
+
+def build_dashboard(sections, selected, user_id):
+    """Run the selected sections and return {section: data}"""
+    names = list(selected)
+
+    if len(names) < 2 or not _runs_concurrently():
+        results = {name: sections[name](user_id) for name in names}
+    else:
+        app = current_app._get_current_object()
+        tenant = current_tenant()
+        read_bind = g.get('db_read_bind')
+        workers = min(len(names), current_app.config.get('DASHBOARD_MAX_WORKERS', 4))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(_run_in_context, app, tenant, read_bind, sections[name], user_id) for name in names}
+            results = {name: future.result() for name, future in futures.items()}
+
+    return {name: _trim(results[name], selected[name]) for name in names}
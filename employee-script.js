@@ -14,16 +14,19 @@ window.addEventListener('DOMContentLoaded', () => {
     const savedTheme = localStorage.getItem('selectedTheme') || 'black';
     document.body.className = `dashboard-body theme-${savedTheme}`;
     
-    // Load statistics
-    updateStatistics();
-    
-    // Load applications
-    loadApplications();
-    
-    // Load sent requests
-    loadSentRequests();
+    // Load statistics, applications and sent requests in one request
+    loadDashboard();
 });
 
+// Load Dashboard
+async function loadDashboard() {
+    const result = await apiGetEmployeeDashboard('statistics,applications,sentRequests');
+    
+    displayStatistics(result.success ? result.statistics : null);
+    setApplications(result.success ? result.applications : null, result.message);
+    setSentRequests(result.success ? result.sentRequests : null);
+}
+
 // Theme Management
 function changeTheme(theme) {
     document.body.className = `dashboard-body theme-${theme}`;
@@ -32,8 +35,8 @@ function changeTheme(theme) {
 }
 
 // Logout
-function logout() {
-    apiLogout();
+async function logout() {
+    await apiLogout();
     window.location.href = 'index.html';
 }
 
@@ -45,9 +48,11 @@ function getApplicationById(applicationId) {
 // Update Statistics
 async function updateStatistics() {
     const apiResult = await apiGetStatistics();
-    
-    if (apiResult.success && apiResult.statistics) {
-        const stats = apiResult.statistics;
+    displayStatistics(apiResult.success ? apiResult.statistics : null);
+}
+
+function displayStatistics(stats) {
+    if (stats) {
         document.getElementById('pendingCount').textContent = stats.pending;
         document.getElementById('approvedCount').textContent = stats.approved;
         document.getElementById('rejectedCount').textContent = stats.rejected;
@@ -67,13 +72,16 @@ let currentApplicationId = null;
 async function loadApplications() {
     console.log('Loading applications...');
     const apiResult = await apiGetAllApplications();
-    
-    if (apiResult.success && apiResult.applications) {
-        allApplications = apiResult.applications;
+    setApplications(apiResult.success ? apiResult.applications : null, apiResult.message);
+}
+
+function setApplications(applications, message) {
+    if (applications) {
+        allApplications = applications;
         console.log('Applications loaded:', allApplications.length);
     } else {
         allApplications = [];
-        console.log('No applications found or error:', apiResult.message);
+        console.log('No applications found or error:', message);
     }
     
     filterApplications();
@@ -318,9 +326,12 @@ let sentRequests = [];
 // Load Sent Requests
 async function loadSentRequests() {
     const result = await apiGetEmployeeSentRequests();
-    
-    if (result.success && result.requests) {
-        sentRequests = result.requests;
+    setSentRequests(result.success ? result.requests : null);
+}
+
+function setSentRequests(requests) {
+    if (requests) {
+        sentRequests = requests;
         displaySentRequests(sentRequests);
     } else {
         document.getElementById('sentRequestsList').innerHTML = `
@@ -0,0 +1,161 @@
+"""Readiness checks and priority-based load shedding.
+
+Every request is counted while in flight. Once the worker gets busy,
+low-priority traffic (statistics, rosters) is refused with 503 and a
+Retry-After header first, then normal traffic, so registration and login
+keep the remaining capacity. Health endpoints are never shed.
+
+The count is per process, so shedding needs a worker that serves several
+requests at once: the Procfile runs gunicorn's gthread worker with
+``GUNICORN_THREADS`` threads, and ``SHED_MAX_IN_FLIGHT`` defaults to the
+same number. A sync worker never has more than one request in flight and
+would never shed.
+"""
+from flask import current_app, g, jsonify, request
+from sqlalchemy import text
+from collections import Counter
+import threading
+import time
+
+PRIORITIES = ('critical', 'normal', 'low')
+
+
+def priority(level):
+    """Mark a view with a shedding priority: 'critical', 'normal', 'low' or 'exempt'"""
+    def decorator(view):
+        view.shed_priority = level
+        return view
+    return decorator
+
+
+class LoadShedder:
+    """In-flight request limiter that sheds by priority"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = Counter()
+        self.shed = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+        app.extensions['load_shedder'] = self
+
+    def limit_for(self, level):
+        """In-flight count at which requests of `level` start being shed"""
+        max_in_flight = current_app.config.get('SHED_MAX_IN_FLIGHT', 64)
+        ratio = {
+            'low': current_app.config.get('SHED_LOW_PRIORITY_RATIO', 0.5),
+            'normal': current_app.config.get('SHED_NORMAL_PRIORITY_RATIO', 0.8)
+        }.get(level, 1.0)
+        return max(1, int(max_in_flight * ratio))
+
+    def _priority_of_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, 'shed_priority', 'normal')
+
+    def _admit(self):
+        if not current_app.config.get('SHED_MAX_IN_FLIGHT', 64):
+            return None
+
+        level = self._priority_of_request()
+        if level == 'exempt':
+            return None
+
+        with self._lock:
+            if self.in_flight >= self.limit_for(level):
+                self.shed[level] += 1
+                shed = True
+            else:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                self.admitted[level] += 1
+                g.shed_admitted = True
+                shed = False
+
+        if shed:
+            response = jsonify({'success': False, 'message': 'الخادم مشغول حالياً، يرجى المحاولة لاحقاً'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(current_app.config.get('SHED_RETRY_AFTER', 5))
+            return response
+        return None
+
+    def _release(self, exc=None):
+        if g.pop('shed_admitted', False):
+            with self._lock:
+                self.in_flight -= 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'inFlight': self.in_flight,
+                'peakInFlight': self.peak_in_flight,
+                'limits': {level: self.limit_for(level) for level in PRIORITIES},
+                'admitted': {level: self.admitted[level] for level in PRIORITIES},
+                'shed': {level: self.shed[level] for level in PRIORITIES}
+            }
+
+
+def pool_status(engine):
+    """Connection pool usage, where the pool reports it"""
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout') or not hasattr(pool, 'size'):
+        return {'type': type(pool).__name__, 'saturation': 0.0}
+
+    capacity = pool.size() + max(0, getattr(pool, '_max_overflow', 0))
+    checked_out = pool.checkedout()
+    return {
+        'type': type(pool).__name__,
+        'checkedOut': checked_out,
+        'capacity': capacity,
+        'saturation': round(checked_out / capacity, 3) if capacity > 0 else 0.0
+    }
+
+
+def check_database(engine):
+    """Read from a real table so a locked or unreachable database fails the check"""
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1 FROM activities LIMIT 1')).first()
+        return {'ok': True, 'latencyMs': round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        return {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+
+def readiness(engines, shedder):
+    """Readiness report; the worker is ready when every tenant's DB answers and nothing is saturated
+
+    `engines` maps tenant names to their engines; each tenant is checked
+    and reported on its own, and one failing tenant makes the worker unready.
+    """
+    shedding = shedder.metrics()
+
+    max_saturation = current_app.config.get('READINESS_MAX_POOL_SATURATION', 0.9)
+    max_latency = current_app.config.get('READINESS_MAX_DB_LATENCY_MS', 1000)
+
+    tenants = {}
+    for name, engine in engines.items():
+        database = check_database(engine)
+        pool = pool_status(engine)
+        checks = {
+            'database': database['ok'] and database['latencyMs'] <= max_latency,
+            'pool': pool['saturation'] < max_saturation
+        }
+        tenants[name] = {'ready': all(checks.values()), 'checks': checks, 'database': database, 'pool': pool}
+
+    checks = {
+        'database': all(tenant['checks']['database'] for tenant in tenants.values()),
+        'pool': all(tenant['checks']['pool'] for tenant in tenants.values()),
+        'capacity': shedding['inFlight'] < shedding['limits']['critical']
+    }
+
+    return all(checks.values()), {
+        'checks': checks,
+        'tenants': tenants,
+        'inFlight': shedding['inFlight']
+    }
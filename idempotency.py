@@ -0,0 +1,129 @@
+"""Idempotency-Key support for retried POST requests.
+
+The first request with a given key reserves it, runs the handler and stores
+the response. Retries with the same key replay that response after a single
+indexed lookup instead of executing the handler again.
+
+A reservation without a stored response is a lease that lasts
+``IDEMPOTENCY_LEASE_SECONDS`` from its ``created_at``. If the worker running
+the original request dies, a retry after the lease takes the key over
+instead of getting 409 until the key expires.
+"""
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from functools import wraps
+import hashlib
+
+from models import db, IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def _replay(record):
+    response = current_app.response_class(
+        record.response_body,
+        status=record.status_code,
+        mimetype='application/json'
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Replay the stored response when a request repeats an Idempotency-Key (use under @jwt_required)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        if len(key) > 100:
+            return jsonify({'success': False, 'message': 'مفتاح التكرار غير صالح'}), 400
+
+        user_id = get_jwt_identity()
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        now = datetime.utcnow()
+
+        record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+        if record and record.expires_at <= now:
+            db.session.delete(record)
+            db.session.commit()
+            record = None
+
+        if record:
+            if record.endpoint != request.path or record.request_hash != request_hash:
+                return jsonify({'success': False, 'message': 'تم استخدام مفتاح التكرار لطلب مختلف'}), 422
+            if record.status_code is not None:
+                return _replay(record)
+
+            lease = timedelta(seconds=current_app.config.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+            if record.created_at + lease > now:
+                return jsonify({'success': False, 'message': 'الطلب الأصلي قيد المعالجة'}), 409
+
+            # The original request's lease ran out: take the reservation over,
+            # unless another retry or the original finished first
+            taken = db.session.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.id == record.id,
+                    IdempotencyKey.status_code == None,
+                    IdempotencyKey.created_at == record.created_at
+                )
+                .values(created_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if not taken:
+                return jsonify({'success': False, 'message': 'الطلب الأصلي قيد المعالجة'}), 409
+        else:
+            # Reserve the key so concurrent retries do not run the handler twice
+            try:
+                db.session.add(IdempotencyKey(
+                    user_id=user_id,
+                    key=key,
+                    endpoint=request.path,
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=now + timedelta(hours=current_app.config.get('IDEMPOTENCY_TTL_HOURS', 24))
+                ))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return jsonify({'success': False, 'message': 'الطلب الأصلي قيد المعالجة'}), 409
+
+        response = current_app.make_response(view(*args, **kwargs))
+
+        # Only the holder of the current lease settles the reservation
+        ours = (
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code == None,
+            IdempotencyKey.created_at == now
+        )
+
+        # Server errors are not stored, so the client can retry them
+        if response.status_code >= 500:
+            db.session.execute(delete(IdempotencyKey).where(*ours))
+        else:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(*ours)
+                .values(status_code=response.status_code, response_body=response.get_data(as_text=True))
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+
+        return response
+    return wrapper
+
+
+def purge_expired_keys(now=None):
+    """Delete idempotency keys past their TTL; returns the number removed"""
+    removed = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at < (now or datetime.utcnow()))
+    ).rowcount
+    db.session.commit()
+    return removed
@@ -0,0 +1,335 @@
+"""Database-backed background job queue.
+
+Handlers call ``enqueue()`` inside their own transaction, so a job only
+becomes visible to workers once the request's commit succeeds and is
+discarded with it on rollback. Jobs are executed by a local worker:
+
+    python jobs.py
+
+The worker drains every tenant's queue in turn (see tenants.py). The
+worker process also runs the lifecycle scheduler (see lifecycle.py) and
+the replication heartbeat (see replicas.py).
+"""
+from flask import current_app
+from sqlalchemy import delete, event, func, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import json
+import random
+import threading
+import time
+
+from models import db, Job, Notification, User, Application, EmployeeRequest
+from analytics import rebuild_rollups
+from statuses import ApplicationStatus, label
+from tenants import tenant_context, tenant_names
+
+# Registered job handlers, keyed by job name
+JOB_HANDLERS = {}
+
+# Set after a commit that enqueued jobs, wakes an in-process worker early
+_wakeup = threading.Event()
+
+
+def job_handler(name):
+    """Register a function as the handler for jobs called `name`"""
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    """Queue a job in the current session; it is committed with the caller's transaction"""
+    if name not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job: {name}')
+
+    job = Job(
+        name=name,
+        payload=json.dumps(payload or {}, ensure_ascii=False),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5)
+    )
+    db.session.add(job)
+    db.session.info['jobs_enqueued'] = True
+    return job
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_worker_after_commit(session):
+    """Wake the local worker once enqueued jobs are actually committed"""
+    if session.info.pop('jobs_enqueued', False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_jobs(session):
+    """Jobs added in a rolled-back transaction never reach the queue"""
+    session.info.pop('jobs_enqueued', None)
+
+
+# ==================== WORKER ====================
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given attempt number"""
+    base = current_app.config.get('JOB_RETRY_BASE_SECONDS', 5)
+    cap = current_app.config.get('JOB_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_stale_jobs():
+    """Return jobs left 'running' by a crashed worker to the queue"""
+    lease = current_app.config.get('JOB_LEASE_SECONDS', 300)
+    cutoff = datetime.utcnow() - timedelta(seconds=lease)
+
+    count = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.started_at < cutoff)
+        .values(status='queued', run_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def claim_next_job():
+    """Atomically claim the oldest due job, or return None if the queue is empty"""
+    while True:
+        now = datetime.utcnow()
+        candidate = db.session.query(Job.id).filter(
+            Job.status == 'queued',
+            Job.run_at <= now
+        ).order_by(Job.run_at, Job.id).first()
+
+        if not candidate:
+            db.session.rollback()
+            return None
+
+        # Conditional update so two workers never claim the same job
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == candidate.id, Job.status == 'queued')
+            .values(status='running', started_at=now, attempts=Job.attempts + 1, updated_at=now)
+        ).rowcount
+        db.session.commit()
+
+        if claimed:
+            return db.session.get(Job, candidate.id)
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome"""
+    handler = JOB_HANDLERS.get(job.name)
+    job_id = job.id
+
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job {job.name}')
+        handler(**json.loads(job.payload or '{}'))
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        db.session.commit()
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = f'{type(e).__name__}: {e}'
+
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+
+        db.session.commit()
+        return False
+
+
+def work_once():
+    """Run due jobs until the queue is drained; returns the number processed"""
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return processed
+        run_job(job)
+        processed += 1
+
+
+def run_worker(app, poll_interval=None, stop_event=None):
+    """Process jobs forever (or until `stop_event` is set)"""
+    stop_event = stop_event or threading.Event()
+
+    with app.app_context():
+        poll_interval = poll_interval or app.config.get('JOB_POLL_INTERVAL', 1.0)
+        last_requeue = 0
+
+        while not stop_event.is_set():
+            requeue = time.monotonic() - last_requeue > 60
+            for tenant in tenant_names():
+                try:
+                    with tenant_context(tenant):
+                        if requeue:
+                            requeue_stale_jobs()
+                        work_once()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Job worker error ({tenant}): {e}")
+                finally:
+                    db.session.remove()
+            if requeue:
+                last_requeue = time.monotonic()
+
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+
+
+def start_worker_thread(app):
+    """Run a worker in a daemon thread of the current process"""
+    worker_thread = threading.Thread(target=run_worker, args=(app,), name='job-worker')
+    worker_thread.daemon = True
+    worker_thread.start()
+    return worker_thread
+
+
+def purge_finished_jobs(now=None, batch_size=None):
+    """Delete done/failed jobs finished more than JOB_RETENTION_DAYS ago; returns the number removed"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=current_app.config.get('JOB_RETENTION_DAYS', 7))
+    batch_size = batch_size or current_app.config.get('LIFECYCLE_BATCH_SIZE', 500)
+    removed = 0
+
+    while True:
+        # Served by ix_jobs_status_finished_at
+        ids = [row.id for row in db.session.query(Job.id).filter(
+            Job.status.in_(('done', 'failed')),
+            Job.finished_at < cutoff
+        ).limit(batch_size)]
+
+        if not ids:
+            break
+
+        removed += db.session.execute(delete(Job).where(Job.id.in_(ids))).rowcount
+        db.session.commit()
+
+    return removed
+
+
+# ==================== METRICS ====================
+
+def queue_metrics(sample_size=500):
+    """Queue depth per status and latency of recently finished jobs"""
+    depth = dict(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+
+    oldest_due = db.session.query(func.min(Job.run_at)).filter(
+        Job.status == 'queued',
+        Job.run_at <= datetime.utcnow()
+    ).scalar()
+
+    recent = Job.query.filter(Job.finished_at != None).order_by(
+        Job.finished_at.desc()
+    ).limit(sample_size).all()
+
+    wait_times = [(job.started_at - job.created_at).total_seconds() for job in recent if job.started_at]
+    run_times = [(job.finished_at - job.started_at).total_seconds() for job in recent if job.started_at]
+
+    def summarize(values):
+        if not values:
+            return {'avg': None, 'p95': None, 'max': None}
+        ordered = sorted(values)
+        return {
+            'avg': round(sum(ordered) / len(ordered), 3),
+            'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            'max': round(ordered[-1], 3)
+        }
+
+    return {
+        'depth': {
+            'queued': depth.get('queued', 0),
+            'running': depth.get('running', 0),
+            'done': depth.get('done', 0),
+            'failed': depth.get('failed', 0)
+        },
+        'oldestDueAgeSeconds': round((datetime.utcnow() - oldest_due).total_seconds(), 3) if oldest_due else 0,
+        'waitSeconds': summarize(wait_times),
+        'runSeconds': summarize(run_times),
+        'sampleSize': len(recent)
+    }
+
+
+# ==================== JOB HANDLERS ====================
+
+@job_handler('notify_employee_request')
+def notify_employee_request(request_id):
+    """Notify the target student (or every student) of a new employee request"""
+    employee_request = db.session.get(EmployeeRequest, request_id)
+    if not employee_request:
+        return
+
+    if employee_request.student_id:
+        recipient_ids = [employee_request.student_id]
+    else:
+        recipient_ids = [row.id for row in db.session.query(User.id).filter_by(role='student')]
+
+    db.session.add_all([
+        Notification(
+            user_id=recipient_id,
+            title='طلب جديد',
+            message=employee_request.title,
+            type='info'
+        )
+        for recipient_id in recipient_ids
+    ])
+
+
+@job_handler('notify_application_status')
+def notify_application_status(application_id):
+    """Notify a student that their application status changed"""
+    application = db.session.get(Application, application_id)
+    if not application:
+        return
+
+    db.session.add(Notification(
+        user_id=application.user_id,
+        title='تحديث حالة الطلب',
+        message=f'حالة طلبك ({application.activity_type}): {label(application.status)}',
+        type='success' if application.status == ApplicationStatus.APPROVED else 'info'
+    ))
+
+
+@job_handler('notify_request_response')
+def notify_request_response(request_id):
+    """Notify an employee that a student responded to their request"""
+    employee_request = db.session.get(EmployeeRequest, request_id)
+    if not employee_request:
+        return
+
+    student = db.session.get(User, employee_request.student_id) if employee_request.student_id else None
+    db.session.add(Notification(
+        user_id=employee_request.employee_id,
+        title='رد على طلب',
+        message=f'{student.full_name if student else "طالب"}: {label(employee_request.status)} - {employee_request.title}',
+        type='info'
+    ))
+
+
+@job_handler('rebuild_participation_rollups')
+def rebuild_participation_rollups():
+    """Recompute the participation analytics rollups from scratch"""
+    rebuild_rollups()
+
+
+if __name__ == '__main__':
+    from app import app
+    from lifecycle import start_scheduler_thread
+    from replicas import start_heartbeat_thread
+
+    print("🛠️  Job worker started / بدء معالج المهام")
+    start_scheduler_thread(app)
+    start_heartbeat_thread(app)
+    try:
+        run_worker(app)
+    except KeyboardInterrupt:
+        print("\n🛑 Job worker stopped")
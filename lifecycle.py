@@ -0,0 +1,116 @@
+"""Scheduled lifecycle sweeps for deadlines and finished activities.
+
+Expired employee requests are moved to a terminal status and ended
+activities are deactivated in indexed batches, so read paths can filter on
+status / is_active alone instead of evaluating dates row by row.
+"""
+from flask import current_app
+from sqlalchemy import update
+from datetime import datetime
+import threading
+
+from models import db, Activity, EmployeeRequest
+from statuses import RequestStatus
+from idempotency import purge_expired_keys
+from sync import purge_tombstones
+from revocation import purge_expired_revocations
+from jobs import purge_finished_jobs
+from tenants import tenant_context, tenant_names
+
+
+def sweep_expired_requests(now=None, batch_size=None):
+    """Expire pending employee requests past their deadline; returns the number expired"""
+    now = now or datetime.utcnow()
+    batch_size = batch_size or current_app.config.get('LIFECYCLE_BATCH_SIZE', 500)
+    expired = 0
+
+    while True:
+        # Served by ix_employee_requests_status_deadline
+        ids = [row.id for row in db.session.query(EmployeeRequest.id).filter(
+            EmployeeRequest.status == RequestStatus.PENDING,
+            EmployeeRequest.deadline != None,
+            EmployeeRequest.deadline < now
+        ).order_by(EmployeeRequest.deadline).limit(batch_size)]
+
+        if not ids:
+            break
+
+        expired += db.session.execute(
+            update(EmployeeRequest)
+            .where(EmployeeRequest.id.in_(ids), EmployeeRequest.status == RequestStatus.PENDING)
+            .values(status=RequestStatus.EXPIRED, updated_at=now)
+        ).rowcount
+        db.session.commit()
+
+    return expired
+
+
+def sweep_ended_activities(now=None, batch_size=None):
+    """Deactivate activities whose end date has passed; returns the number deactivated"""
+    now = now or datetime.utcnow()
+    batch_size = batch_size or current_app.config.get('LIFECYCLE_BATCH_SIZE', 500)
+    deactivated = 0
+
+    while True:
+        # Served by ix_activities_is_active_end_date
+        ids = [row.id for row in db.session.query(Activity.id).filter(
+            Activity.is_active == True,
+            Activity.end_date != None,
+            Activity.end_date < now
+        ).order_by(Activity.end_date).limit(batch_size)]
+
+        if not ids:
+            break
+
+        deactivated += db.session.execute(
+            update(Activity)
+            .where(Activity.id.in_(ids), Activity.is_active == True)
+            .values(is_active=False, updated_at=now)
+        ).rowcount
+        db.session.commit()
+
+    return deactivated
+
+
+def sweep_all(now=None):
+    """Run every lifecycle sweep once"""
+    now = now or datetime.utcnow()
+    return {
+        'expiredRequests': sweep_expired_requests(now),
+        'deactivatedActivities': sweep_ended_activities(now),
+        'purgedIdempotencyKeys': purge_expired_keys(now),
+        'purgedTombstones': purge_tombstones(now),
+        'purgedRevocations': purge_expired_revocations(now),
+        'purgedJobs': purge_finished_jobs(now)
+    }
+
+
+def run_scheduler(app, interval=None, stop_event=None):
+    """Run the lifecycle sweeps on a fixed timer (until `stop_event` is set)"""
+    stop_event = stop_event or threading.Event()
+
+    with app.app_context():
+        interval = interval or app.config.get('LIFECYCLE_SWEEP_INTERVAL', 60)
+
+        while not stop_event.is_set():
+            for tenant in tenant_names():
+                try:
+                    with tenant_context(tenant):
+                        result = sweep_all()
+                    if any(result.values()):
+                        print(f"⏰ Lifecycle sweep ({tenant}): {result}")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Lifecycle sweep error ({tenant}): {e}")
+                finally:
+                    db.session.remove()
+
+            stop_event.wait(interval)
+
+
+def start_scheduler_thread(app):
+    """Run the lifecycle scheduler in a daemon thread of the current process"""
+    scheduler_thread = threading.Thread(target=run_scheduler, args=(app,), name='lifecycle-scheduler')
+    scheduler_thread.daemon = True
+    scheduler_thread.start()
+    return scheduler_thread
@@ -0,0 +1,167 @@
+"""Serializers, listings and statistics shared by the list endpoints and
+the composite dashboards (see dashboard.py).
+
+Each function takes the id of the requesting user (looked up once by the
+view) and returns the JSON-ready data of one list or counter, so a single
+endpoint and a dashboard section return the same thing for the same data.
+The activity catalog and the status counters are served from per-process
+``VersionedCache`` instances, kept coherent across workers by the
+entity_versions change log.
+"""
+from sqlalchemy import func
+
+from models import db, User, Activity, ActivityRegistration, Application, EmployeeRequest
+from statuses import ApplicationStatus, RequestStatus, label
+from changelog import VersionedCache
+
+activity_catalog_cache = VersionedCache('activities')
+application_statistics_cache = VersionedCache('applications')
+request_statistics_cache = VersionedCache('employee_requests')
+
+
+# ==================== SERIALIZERS ====================
+
+def activity_entry(activity):
+    """Serialize an activity for catalog responses"""
+    return {
+        'id': activity.id,
+        'name': activity.name,
+        'description': activity.description,
+        'category': activity.category,
+        'availableSlots': activity.available_slots,
+        'registeredCount': activity.registered_count,
+        'location': activity.location,
+        'startDate': activity.start_date.isoformat() if activity.start_date else None,
+        'endDate': activity.end_date.isoformat() if activity.end_date else None,
+        'isActive': activity.is_active
+    }
+
+
+def active_catalog():
+    """Serialized active activities, shared by all users"""
+    return activity_catalog_cache.get('active', lambda: [
+        activity_entry(activity) for activity in Activity.query.filter_by(is_active=True)
+    ])
+
+
+def catalog_items(entries, registrations):
+    """Catalog entries with the user's registration status; returns (items, inactive ids)
+
+    `registrations` maps activity ids to the user's registrations.
+    """
+    items = []
+    inactive = []
+    for entry in entries:
+        # Deactivated activities leave the catalog
+        if not entry['isActive']:
+            inactive.append(entry['id'])
+            continue
+
+        registration = registrations.get(entry['id'])
+        item = {key: value for key, value in entry.items() if key != 'isActive'}
+        item['isRegistered'] = registration is not None
+        item['registrationStatus'] = label(registration.status) if registration else None
+        items.append(item)
+    return items, inactive
+
+
+# ==================== STATISTICS ====================
+
+def _status_counts(query, column, statuses):
+    counts = dict(query.with_entities(column, func.count()).group_by(column).all())
+    result = {'total': sum(counts.values())}
+    for status in statuses:
+        result[status.name.lower()] = counts.get(status, 0)
+    return result
+
+
+def application_statistics(user_id):
+    return application_statistics_cache.get('all', lambda: _status_counts(
+        Application.query, Application.status,
+        (ApplicationStatus.PENDING, ApplicationStatus.APPROVED, ApplicationStatus.REJECTED)
+    ))
+
+
+def request_statistics(user_id):
+    return request_statistics_cache.get(user_id, lambda: _status_counts(
+        EmployeeRequest.query.filter_by(employee_id=user_id), EmployeeRequest.status,
+        (RequestStatus.PENDING, RequestStatus.APPROVED, RequestStatus.REJECTED, RequestStatus.EXPIRED)
+    ))
+
+
+# ==================== LISTINGS ====================
+
+def all_applications(user_id):
+    return [application.to_dict() for application in Application.query.order_by(Application.submitted_at.desc())]
+
+
+def my_applications(user_id):
+    return [
+        application.to_dict()
+        for application in Application.query.filter_by(user_id=user_id).order_by(Application.submitted_at.desc())
+    ]
+
+
+def sent_requests(user_id):
+    return [
+        req.to_dict()
+        for req in EmployeeRequest.query.filter_by(employee_id=user_id).order_by(EmployeeRequest.created_at.desc())
+    ]
+
+
+def received_requests(user_id):
+    """Requests addressed to the student, and general requests"""
+    return [
+        req.to_dict()
+        for req in EmployeeRequest.query.filter(
+            (EmployeeRequest.student_id == user_id) | (EmployeeRequest.student_id == None)
+        ).order_by(EmployeeRequest.created_at.desc())
+    ]
+
+
+def employee_activities(user_id):
+    """All activities with their registered students, in two queries"""
+    students = {}
+    rows = db.session.query(ActivityRegistration, User).join(User, User.id == ActivityRegistration.user_id)
+    for reg, student in rows:
+        students.setdefault(reg.activity_id, []).append({
+            'id': student.id,
+            'name': student.full_name,
+            'email': student.email,
+            'registeredAt': reg.registered_at.isoformat(),
+            'status': label(reg.status)
+        })
+
+    result = []
+    for activity in Activity.query.all():
+        item = activity_entry(activity)
+        item['students'] = students.get(activity.id, [])
+        result.append(item)
+    return result
+
+
+def student_activities(user_id):
+    """The active catalog with the user's registration status"""
+    registrations = {reg.activity_id: reg for reg in ActivityRegistration.query.filter_by(user_id=user_id)}
+    return catalog_items(active_catalog(), registrations)[0]
+
+
+def my_registrations(user_id):
+    rows = db.session.query(ActivityRegistration, Activity).join(
+        Activity, Activity.id == ActivityRegistration.activity_id
+    ).filter(ActivityRegistration.user_id == user_id)
+    return [
+        {
+            'id': reg.id,
+            'activity': {
+                'id': activity.id,
+                'name': activity.name,
+                'description': activity.description,
+                'category': activity.category,
+                'location': activity.location
+            },
+            'status': label(reg.status),
+            'registeredAt': reg.registered_at.isoformat()
+        }
+        for reg, activity in rows
+    ]
@@ -0,0 +1,235 @@
+"""Data migrations for databases created by earlier versions.
+
+``add_tenant_columns`` adds the ``tenant_id`` column to existing tables,
+filled with the tenant the database belongs to. ``migrate_status_columns``
+then converts the legacy Arabic-string status columns to the SMALLINT enum
+encoding; rows whose status matches no known label keep their original
+value in ``legacy_status_values`` and are counted in the log. Next,
+``add_missing_columns`` and ``create_missing_indexes`` add the nullable
+columns and the indexes added to models after a table was created.
+Finally ``backfill_rollups`` fills the analytics rollups from data
+recorded before they existed. All are no-ops once applied, so they run on
+every startup, in that order:
+
+    python migrations.py
+"""
+from sqlalchemy import Integer, inspect, text
+
+from models import db, ActivityRegistration, Application, ParticipationRollup
+from analytics import rebuild_rollups
+from statuses import LABELS, ApplicationStatus, RequestStatus, RegistrationStatus
+
+# Tables whose rows record the tenant that owns them
+TENANT_TABLES = ('users', 'activities', 'applications', 'employee_requests')
+
+# Tables whose `status` column holds an enum, with the enum it holds
+STATUS_TABLES = (
+    ('applications', ApplicationStatus),
+    ('employee_requests', RequestStatus),
+    ('activity_registrations', RegistrationStatus)
+)
+
+
+# Original values of statuses no label matched, kept for manual review
+LEGACY_STATUS_TABLE = 'legacy_status_values'
+
+
+def _status_case(enum_cls, column='status'):
+    """SQL CASE mapping legacy labels to enum values (unknown labels become the default)
+
+    Run ``_preserve_unknown_statuses`` first so unknown labels are not lost.
+    """
+    whens = ' '.join(
+        f"WHEN '{status_label}' THEN {int(status)}"
+        for status, status_label in LABELS[enum_cls].items()
+    )
+    return f'CASE {column} {whens} ELSE 0 END'
+
+
+def _preserve_unknown_statuses(conn, table, enum_cls):
+    """Copy statuses no label matches to LEGACY_STATUS_TABLE; returns {status: count}"""
+    labels = ', '.join(f"'{status_label}'" for status_label in LABELS[enum_cls].values())
+    unknown = f'status IS NULL OR status NOT IN ({labels})'
+
+    counts = dict(conn.execute(text(
+        f'SELECT status, COUNT(*) FROM {table} WHERE {unknown} GROUP BY status'
+    )).all())
+    if not counts:
+        return counts
+
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS {LEGACY_STATUS_TABLE} ('
+        'table_name VARCHAR(50) NOT NULL, row_id INTEGER NOT NULL, status TEXT, '
+        'PRIMARY KEY (table_name, row_id))'
+    ))
+    conn.execute(text(
+        f"INSERT INTO {LEGACY_STATUS_TABLE} (table_name, row_id, status) "
+        f"SELECT '{table}', id, status FROM {table} WHERE {unknown}"
+    ))
+    details = ', '.join(f'{status!r}: {count}' for status, count in counts.items())
+    print(f"⚠️ {table}: {sum(counts.values())} rows with unknown statuses set to the default "
+          f"(originals kept in {LEGACY_STATUS_TABLE}): {details}")
+    return counts
+
+
+def _needs_migration(inspector, table):
+    if not inspector.has_table(table):
+        return False
+    column = next((column for column in inspector.get_columns(table) if column['name'] == 'status'), None)
+    return column is not None and not isinstance(column['type'], Integer)
+
+
+def _migrate_postgresql(conn, table, enum_cls):
+    conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN status DROP DEFAULT'))
+    conn.execute(text(
+        f'ALTER TABLE {table} ALTER COLUMN status TYPE SMALLINT USING {_status_case(enum_cls)}'
+    ))
+    conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN status SET NOT NULL'))
+    for index in db.metadata.tables[table].indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _migrate_sqlite(conn, inspector, table, enum_cls):
+    """SQLite cannot change a column type, so the table is rebuilt and copied"""
+    legacy = f'{table}_legacy'
+    legacy_columns = {column['name'] for column in inspector.get_columns(table)}
+    legacy_indexes = [index['name'] for index in inspector.get_indexes(table)]
+
+    conn.execute(text(f'ALTER TABLE {table} RENAME TO {legacy}'))
+    for index_name in legacy_indexes:
+        conn.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+
+    new_table = db.metadata.tables[table]
+    new_table.create(conn)
+
+    columns = [column.name for column in new_table.columns if column.name in legacy_columns]
+    select_list = ', '.join(_status_case(enum_cls) if name == 'status' else name for name in columns)
+    conn.execute(text(
+        f'INSERT INTO {table} ({", ".join(columns)}) SELECT {select_list} FROM {legacy}'
+    ))
+    conn.execute(text(f'DROP TABLE {legacy}'))
+
+
+def add_tenant_columns(engine, tenant):
+    """Add a tenant_id column filled with `tenant` where missing; returns the migrated tables"""
+    migrated = []
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in TENANT_TABLES:
+            if not inspector.has_table(table):
+                continue
+            if any(column['name'] == 'tenant_id' for column in inspector.get_columns(table)):
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN tenant_id VARCHAR(50) NOT NULL DEFAULT '{tenant}'"
+            ))
+            migrated.append(table)
+
+    if migrated:
+        print(f"✅ Added tenant column ({tenant}): {', '.join(migrated)}")
+    return migrated
+
+
+def migrate_status_columns(engine):
+    """Convert legacy string status columns to integer enums; returns the migrated tables"""
+    migrated = []
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table, enum_cls in STATUS_TABLES:
+            if not _needs_migration(inspector, table):
+                continue
+
+            _preserve_unknown_statuses(conn, table, enum_cls)
+            if conn.dialect.name == 'postgresql':
+                _migrate_postgresql(conn, table, enum_cls)
+            else:
+                _migrate_sqlite(conn, inspector, table, enum_cls)
+            migrated.append(table)
+
+    if migrated:
+        print(f"✅ Migrated status columns to integer enums: {', '.join(migrated)}")
+    return migrated
+
+
+def add_missing_columns(engine):
+    """Add nullable model columns that tables from earlier versions lack; returns them as table.column
+
+    Columns that need a value for existing rows get their own migration
+    (see ``add_tenant_columns``).
+    """
+    added = []
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added.append(f'{table.name}.{column.name}')
+
+    if added:
+        print(f"✅ Added missing columns: {', '.join(added)}")
+    return added
+
+
+def create_missing_indexes(engine):
+    """Create model indexes that tables from earlier versions lack; returns their names
+
+    ``create_all`` skips existing tables entirely, so indexes added to a
+    model later are only built here.
+    """
+    created = []
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn, checkfirst=True)
+                    created.append(index.name)
+
+    if created:
+        print(f"✅ Created missing indexes: {', '.join(created)}")
+    return created
+
+
+def backfill_rollups():
+    """Build the analytics rollups of the current tenant if they are empty but data exists
+
+    Incremental updates only count changes made after the rollups were
+    introduced; without a backfill, a status change of an older application
+    would subtract from a counter that never counted it.
+    """
+    if db.session.query(ParticipationRollup.id).first() is not None:
+        return 0
+    if db.session.query(Application.id).first() is None and db.session.query(ActivityRegistration.id).first() is None:
+        return 0
+
+    rows = rebuild_rollups()
+    print(f"✅ Backfilled analytics rollups: {rows} rows")
+    return rows
+
+
+if __name__ == '__main__':
+    from app import app
+
+    from tenants import tenant_context, tenant_engine, tenant_names
+
+    with app.app_context():
+        for tenant in tenant_names():
+            add_tenant_columns(tenant_engine(tenant), tenant)
+            migrate_status_columns(tenant_engine(tenant))
+            add_missing_columns(tenant_engine(tenant))
+            create_missing_indexes(tenant_engine(tenant))
+            with tenant_context(tenant):
+                backfill_rollups()
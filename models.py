@@ -1,7 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-db = SQLAlchemy()
+from statuses import ApplicationStatus, RequestStatus, RegistrationStatus, IntEnumType, label
+from replicas import RoutingSession
+from tenants import current_tenant
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """User model for students and employees"""
@@ -13,6 +17,7 @@ class User(db.Model):
     email = db.Column(db.String(200), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # 'student' or 'employee'
+    tenant_id = db.Column(db.String(50), nullable=False, default=current_tenant)  # Campus owning the row
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -32,6 +37,7 @@ class Activity(db.Model):
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
     category = db.Column(db.String(100), nullable=False)  # e.g., 'رياضي', 'ثقافي', 'فني'
+    tenant_id = db.Column(db.String(50), nullable=False, default=current_tenant)  # Campus owning the row
     available_slots = db.Column(db.Integer, default=50)
     registered_count = db.Column(db.Integer, default=0)
     location = db.Column(db.String(200), nullable=True)
@@ -39,11 +45,16 @@ class Activity(db.Model):
     end_date = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     registrations = db.relationship('ActivityRegistration', backref='activity', lazy='dynamic', cascade='all, delete-orphan')
     
+    # Lifecycle sweeps look up active activities by end date
+    __table_args__ = (
+        db.Index('ix_activities_is_active_end_date', 'is_active', 'end_date'),
+    )
+    
     def __repr__(self):
         return f'<Activity {self.name} ({self.registered_count}/{self.available_slots})>'
     
@@ -65,13 +76,14 @@ class ActivityRegistration(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    status = db.Column(db.String(50), default='مسجل')  # 'مسجل', 'حضر', 'غائب', 'ملغي'
+    status = db.Column(IntEnumType(RegistrationStatus), default=RegistrationStatus.REGISTERED, nullable=False)
     registered_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Unique constraint to prevent duplicate registrations
     __table_args__ = (
         db.UniqueConstraint('activity_id', 'user_id', name='unique_activity_user'),
+        db.Index('ix_activity_registrations_activity_status', 'activity_id', 'status'),
     )
     
     def __repr__(self):
@@ -92,12 +104,13 @@ class Application(db.Model):
     specialization = db.Column(db.String(200), nullable=False)
     phone = db.Column(db.String(50), nullable=False)
     details = db.Column(db.Text, nullable=True)
-    status = db.Column(db.String(50), default='قيد الانتظار')  # 'قيد الانتظار', 'مقبول', 'مرفوض'
+    tenant_id = db.Column(db.String(50), nullable=False, default=current_tenant)  # Campus owning the row
+    status = db.Column(IntEnumType(ApplicationStatus), default=ApplicationStatus.PENDING, nullable=False, index=True)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def __repr__(self):
-        return f'<Application {self.id} - {self.activity_type} ({self.status})>'
+        return f'<Application {self.id} - {self.activity_type} ({label(self.status)})>'
     
     def to_dict(self):
         """Convert application to dictionary"""
@@ -112,7 +125,7 @@ class Application(db.Model):
             'specialization': self.specialization,
             'phone': self.phone,
             'details': self.details,
-            'status': self.status,
+            'status': label(self.status),
             'submittedAt': self.submitted_at.isoformat(),
             'updatedAt': self.updated_at.isoformat()
         }
@@ -131,18 +144,24 @@ class EmployeeRequest(db.Model):
     activity_name = db.Column(db.String(200), nullable=True)
     activity_code = db.Column(db.String(100), nullable=True)
     deadline = db.Column(db.DateTime, nullable=True)
-    status = db.Column(db.String(50), default='قيد الانتظار')  # 'قيد الانتظار', 'مقبول', 'مرفوض'
+    status = db.Column(IntEnumType(RequestStatus), default=RequestStatus.PENDING, nullable=False)
     response_message = db.Column(db.Text, nullable=True)  # Student's response message
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     responded_at = db.Column(db.DateTime, nullable=True)
+    tenant_id = db.Column(db.String(50), nullable=False, default=current_tenant)  # Campus owning the row
     
     # Relationships
     employee = db.relationship('User', foreign_keys=[employee_id], backref='sent_requests')
     student = db.relationship('User', foreign_keys=[student_id], backref='received_requests')
     
+    # Lifecycle sweeps look up pending requests by deadline
+    __table_args__ = (
+        db.Index('ix_employee_requests_status_deadline', 'status', 'deadline'),
+    )
+    
     def __repr__(self):
-        return f'<EmployeeRequest {self.id} - {self.title} ({self.status})>'
+        return f'<EmployeeRequest {self.id} - {self.title} ({label(self.status)})>'
     
     def to_dict(self):
         """Convert request to dictionary"""
@@ -161,7 +180,7 @@ class EmployeeRequest(db.Model):
             'activityName': self.activity_name,
             'activityCode': self.activity_code,
             'deadline': self.deadline.isoformat() if self.deadline else None,
-            'status': self.status,
+            'status': label(self.status),
             'responseMessage': self.response_message,
             'createdAt': self.created_at.isoformat(),
             'updatedAt': self.updated_at.isoformat(),
@@ -183,3 +202,123 @@ class Notification(db.Model):
     
     def __repr__(self):
         return f'<Notification {self.id} - {self.title}>'
+
+
+class Job(db.Model):
+    """Background job model for the database-backed job queue"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON-encoded arguments
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'done', 'failed'
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Workers poll for due jobs by (status, run_at); the retention purge
+    # finds finished jobs by (status, finished_at)
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_jobs_status_finished_at', 'status', 'finished_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Job {self.id} - {self.name} ({self.status})>'
+
+
+class ParticipationRollup(db.Model):
+    """Daily participation counters per college, department and category"""
+    __tablename__ = 'participation_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.Date, nullable=False)  # Day the counted event belongs to
+    dimension = db.Column(db.String(20), nullable=False)  # 'college', 'department', 'category'
+    value = db.Column(db.String(200), nullable=False)
+    submitted = db.Column(db.Integer, default=0, nullable=False)
+    approved = db.Column(db.Integer, default=0, nullable=False)
+    rejected = db.Column(db.Integer, default=0, nullable=False)
+    registrations = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # One row per (day, dimension, value); range scans are by dimension then day
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'bucket', 'value', name='unique_rollup_bucket'),
+    )
+    
+    def __repr__(self):
+        return f'<ParticipationRollup {self.bucket} {self.dimension}={self.value}>'
+
+
+class IdempotencyKey(db.Model):
+    """Stored responses for client-supplied Idempotency-Key headers"""
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    endpoint = db.Column(db.String(200), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the request body
+    status_code = db.Column(db.Integer, nullable=True)  # Null while the original request is in flight
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    # Replays are looked up by (user_id, key)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key'),
+    )
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} User:{self.user_id} ({self.status_code})>'
+
+
+class Tombstone(db.Model):
+    """Record of a deleted row, so delta-sync clients can drop their copy"""
+    __tablename__ = 'tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # Table name of the deleted row
+    entity_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)  # Only user who could see the row (None: everyone)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_tombstones_entity_deleted_at', 'entity', 'deleted_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Tombstone {self.entity}:{self.entity_id}>'
+
+
+class RevokedToken(db.Model):
+    """Revoked JWTs: a single token (jti) or every token a user was issued before a time"""
+    __tablename__ = 'revoked_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=True, index=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+    revoked_before = db.Column(db.DateTime, nullable=True)  # User-wide: tokens issued before this are revoked
+    reason = db.Column(db.String(50), nullable=False)  # 'logout', 'password_change', 'account_removed'
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # No token it covers outlives this
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Incremental refresh cursor
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti or f"user:{self.user_id}"} ({self.reason})>'
+
+
+class EntityVersion(db.Model):
+    """Change counter per entity type, bumped in the transaction that changes it"""
+    __tablename__ = 'entity_versions'
+    
+    entity = db.Column(db.String(50), primary_key=True)  # Table name, e.g. 'activities'
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<EntityVersion {self.entity} v{self.version}>'
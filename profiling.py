@@ -0,0 +1,211 @@
+"""On-demand statistical profiling of live requests.
+
+While enabled, a sampled share of matching requests is profiled: a
+sampler thread records the profiled request threads' stacks every few
+milliseconds, and SQLAlchemy cursor events time each SQL statement they
+run. Finished profiles are kept in a ring buffer and can be exported as
+collapsed stacks (the input format of flamegraph.pl / speedscope).
+
+When disabled, the request hooks return after a single attribute check
+and no SQLAlchemy listeners are installed. Profiling state is per worker
+process.
+"""
+from flask import g, request
+from sqlalchemy import event
+from collections import Counter, deque
+from datetime import datetime
+import os
+import random
+import sys
+import threading
+import time
+
+
+class ProfilerState:
+    def __init__(self):
+        self.enabled = False
+        self.endpoint = None  # View name or path to profile; None profiles every route
+        self.sample_rate = 1.0
+        self.interval = 0.005
+        self.max_depth = 128
+        self.active = {}  # thread id -> RequestProfile
+        self.profiles = deque(maxlen=200)
+        self.lock = threading.Lock()
+        self.sampler = None
+        self.engines = []
+
+
+class RequestProfile:
+    def __init__(self, endpoint, path):
+        self.endpoint = endpoint
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.sql = []
+        self._sql_started = None
+
+    def to_dict(self, include_stacks=False):
+        result = {
+            'endpoint': self.endpoint,
+            'path': self.path,
+            'startedAt': self.started_at.isoformat(),
+            'durationMs': round(self.duration * 1000, 2) if self.duration is not None else None,
+            'samples': self.samples,
+            'sqlCount': len(self.sql),
+            'sqlTotalMs': round(sum(duration for _, duration in self.sql) * 1000, 2),
+            'sql': [
+                {'statement': statement, 'durationMs': round(duration * 1000, 3)}
+                for statement, duration in sorted(self.sql, key=lambda item: -item[1])[:20]
+            ]
+        }
+        if include_stacks:
+            result['stacks'] = dict(self.stacks.most_common(50))
+        return result
+
+
+state = ProfilerState()
+
+
+# ==================== SAMPLING ====================
+
+def _collapse(frame, max_depth):
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _sample_loop():
+    while state.enabled:
+        if state.active:
+            frames = sys._current_frames()
+            for thread_id, profile in list(state.active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.stacks[_collapse(frame, state.max_depth)] += 1
+                    profile.samples += 1
+            del frames
+        time.sleep(state.interval)
+
+
+# ==================== SQL TIMING ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = state.active.get(threading.get_ident())
+    if profile is not None:
+        profile._sql_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = state.active.get(threading.get_ident())
+    if profile is not None and profile._sql_started is not None:
+        profile.sql.append((statement, time.perf_counter() - profile._sql_started))
+        profile._sql_started = None
+
+
+# ==================== CONTROL ====================
+
+def enable(engines, endpoint=None, sample_rate=1.0, interval_ms=5):
+    """Start profiling matching requests on this worker"""
+    with state.lock:
+        state.endpoint = endpoint or None
+        state.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        state.interval = max(0.001, float(interval_ms) / 1000)
+
+        if state.enabled:
+            return
+
+        state.engines = list(engines)
+        for engine in state.engines:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+        state.enabled = True
+        state.sampler = threading.Thread(target=_sample_loop, name='profiler-sampler')
+        state.sampler.daemon = True
+        state.sampler.start()
+
+
+def disable():
+    """Stop profiling and remove every hook; collected profiles are kept"""
+    with state.lock:
+        if not state.enabled:
+            return
+        state.enabled = False
+        for engine in state.engines:
+            event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+        state.engines = []
+        state.active.clear()
+
+
+def clear():
+    state.profiles.clear()
+
+
+def status():
+    return {
+        'enabled': state.enabled,
+        'endpoint': state.endpoint,
+        'sampleRate': state.sample_rate,
+        'intervalMs': round(state.interval * 1000, 3),
+        'storedProfiles': len(state.profiles)
+    }
+
+
+# ==================== REQUEST HOOKS ====================
+
+def start_request_profile():
+    """before_request hook"""
+    if not state.enabled:
+        return None
+    if state.endpoint and state.endpoint not in (request.endpoint, request.path):
+        return None
+    if random.random() >= state.sample_rate:
+        return None
+
+    profile = RequestProfile(request.endpoint, request.path)
+    state.active[threading.get_ident()] = profile
+    g.request_profile = profile
+    return None
+
+
+def finish_request_profile(exc=None):
+    """teardown_request hook"""
+    if not state.enabled:
+        return
+    profile = g.pop('request_profile', None)
+    if profile is None:
+        return
+
+    state.active.pop(threading.get_ident(), None)
+    profile.duration = time.perf_counter() - profile.started
+    state.profiles.append(profile)
+
+
+def init_profiling(app):
+    app.before_request(start_request_profile)
+    app.teardown_request(finish_request_profile)
+
+
+# ==================== EXPORT ====================
+
+def _matching_profiles(endpoint=None):
+    return [profile for profile in list(state.profiles) if not endpoint or endpoint in (profile.endpoint, profile.path)]
+
+
+def collapsed_stacks(endpoint=None):
+    """Aggregate stored profiles into collapsed-stack text ("frame;frame;frame count")"""
+    totals = Counter()
+    for profile in _matching_profiles(endpoint):
+        totals.update(profile.stacks)
+    return '\n'.join(f'{stack} {count}' for stack, count in totals.most_common()) + '\n'
+
+
+def profile_summaries(endpoint=None):
+    return [profile.to_dict() for profile in _matching_profiles(endpoint)]
@@ -0,0 +1,208 @@
+"""Read/write splitting across read replicas.
+
+Replica URIs (``REPLICA_DATABASE_URIS``, comma-separated) become
+``SQLALCHEMY_BINDS`` named ``replica_0``, ``replica_1``, ... Views marked
+with ``@read_only`` run their queries on a healthy replica; everything
+else, and every flush, uses the primary. A user who wrote recently
+(``READ_YOUR_WRITES_SECONDS``) stays on the primary so they always see
+their own changes, and replicas whose heartbeat lags more than
+``REPLICA_MAX_LAG_SECONDS`` behind are skipped.
+
+For local testing, point ``REPLICA_DATABASE_URIS`` at a second SQLite file
+that is periodically copied from the primary.
+"""
+from flask import current_app, g, has_app_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from datetime import datetime
+from functools import wraps
+import itertools
+import threading
+import time
+
+REPLICA_BIND_PREFIX = 'replica_'
+LAST_WRITE_COOKIE = 'last_write_at'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# user_id -> monotonic time of their last successful write in this process
+_last_writes = {}
+_round_robin = itertools.count()
+
+# bind key -> (checked_at, lag_seconds)
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+
+class RoutingSession(Session):
+    """Session that sends everything to the current tenant's database and
+    reads to the replica chosen for the current view"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            tenant = g.get('tenant_bind')
+            if tenant is not None:
+                return self._db.engines[tenant]
+            replica = g.get('db_read_bind')
+            if replica is not None and not self._flushing:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def configure_replicas(app):
+    """Register replica URIs from the environment as SQLAlchemy binds"""
+    uris = [uri.strip() for uri in app.config.get('REPLICA_DATABASE_URIS', '').split(',') if uri.strip()]
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for index, uri in enumerate(uris):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def replica_keys():
+    return [key for key in current_app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith(REPLICA_BIND_PREFIX)]
+
+
+# ==================== LAG ====================
+
+def ensure_heartbeat_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS replication_heartbeat (id INTEGER PRIMARY KEY, beat_at VARCHAR(32) NOT NULL)'))
+
+
+def beat(engine):
+    """Record the current time on the primary; replicas receive it through replication"""
+    with engine.begin() as conn:
+        updated = conn.execute(
+            text('UPDATE replication_heartbeat SET beat_at = :now WHERE id = 1'),
+            {'now': datetime.utcnow().isoformat()}
+        ).rowcount
+        if not updated:
+            conn.execute(
+                text('INSERT INTO replication_heartbeat (id, beat_at) VALUES (1, :now)'),
+                {'now': datetime.utcnow().isoformat()}
+            )
+
+
+def replica_lag(key):
+    """Seconds the replica's heartbeat trails the clock (cached briefly); None if unreachable"""
+    interval = current_app.config.get('REPLICA_LAG_CHECK_INTERVAL', 2)
+    now = time.monotonic()
+
+    with _lag_lock:
+        cached = _lag_cache.get(key)
+    if cached and now - cached[0] < interval:
+        return cached[1]
+
+    engine = current_app.extensions['sqlalchemy'].engines[key]
+    try:
+        with engine.connect() as conn:
+            beat_at = conn.execute(text('SELECT beat_at FROM replication_heartbeat WHERE id = 1')).scalar()
+        lag = (datetime.utcnow() - datetime.fromisoformat(beat_at)).total_seconds() if beat_at else None
+    except Exception:
+        lag = None
+
+    with _lag_lock:
+        _lag_cache[key] = (now, lag)
+    return lag
+
+
+def run_heartbeat(app, interval=None, stop_event=None):
+    """Write heartbeats to the primary on a timer"""
+    stop_event = stop_event or threading.Event()
+
+    with app.app_context():
+        engine = app.extensions['sqlalchemy'].engines[None]
+        ensure_heartbeat_table(engine)
+        interval = interval or app.config.get('REPLICA_HEARTBEAT_INTERVAL', 1)
+
+        while not stop_event.is_set():
+            try:
+                beat(engine)
+            except Exception as e:
+                print(f"❌ Replication heartbeat error: {e}")
+            stop_event.wait(interval)
+
+
+def start_heartbeat_thread(app):
+    """Run the replication heartbeat in a daemon thread of the current process"""
+    heartbeat_thread = threading.Thread(target=run_heartbeat, args=(app,), name='replication-heartbeat')
+    heartbeat_thread.daemon = True
+    heartbeat_thread.start()
+    return heartbeat_thread
+
+
+# ==================== ROUTING ====================
+
+def _wrote_recently(user_id):
+    window = current_app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+
+    last_write = _last_writes.get(user_id)
+    if last_write is not None and time.monotonic() - last_write < window:
+        return True
+
+    # Covers writes handled by another worker process
+    try:
+        cookie = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        cookie = 0
+    return time.time() - cookie < window
+
+
+def choose_replica(user_id=None):
+    """Pick a replica with acceptable lag, or None to read from the primary"""
+    keys = replica_keys()
+    # Replicas mirror the primary, which only holds the default tenant
+    if not keys or g.get('tenant_bind') or (user_id is not None and _wrote_recently(user_id)):
+        return None
+
+    max_lag = current_app.config.get('REPLICA_MAX_LAG_SECONDS', 5)
+    start = next(_round_robin)
+    for offset in range(len(keys)):
+        key = keys[(start + offset) % len(keys)]
+        lag = replica_lag(key)
+        if lag is not None and lag <= max_lag:
+            return key
+    return None
+
+
+def read_only(view):
+    """Serve this view's queries from a read replica when one is usable (use under @jwt_required)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_bind = choose_replica(get_jwt_identity())
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.pop('db_read_bind', None)
+    return wrapper
+
+
+def note_write(user_id):
+    """Keep `user_id` on the primary after this request, for views without a JWT"""
+    g.written_user_id = user_id
+
+
+def record_write(response):
+    """after_request hook: keep users who just wrote on the primary"""
+    if request.method not in WRITE_METHODS or response.status_code >= 400:
+        return response
+
+    # Register and login carry no JWT yet; they name their user explicitly
+    user_id = g.get('written_user_id')
+    if user_id is None:
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            # No JWT was verified for this request
+            return response
+
+    if user_id is not None:
+        _last_writes[user_id] = time.monotonic()
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            str(time.time()),
+            max_age=int(current_app.config.get('READ_YOUR_WRITES_SECONDS', 5)) + 1,
+            httponly=True,
+            samesite='Lax'
+        )
+    return response
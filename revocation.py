@@ -0,0 +1,201 @@
+"""JWT revocation backed by the revoked_tokens table and a per-process Bloom filter.
+
+Every ``@jwt_required()`` call asks ``is_token_revoked``. The Bloom filter
+holds the keys of all unexpired revocations (``jti:<jti>`` and
+``user:<id>``), so the common "not revoked" answer needs no I/O; only a
+filter hit is confirmed against the database. The filter is refreshed
+incrementally at most every ``REVOCATION_REFRESH_SECONDS`` from rows
+created since the previous refresh, re-reading an overlap window
+(``REVOCATION_REFRESH_OVERLAP_SECONDS``) so rows whose transaction commits
+late are not skipped, and rebuilt from unexpired rows every
+``REVOCATION_REBUILD_SECONDS``, which drops purged entries. A revocation
+made by another worker process takes effect here within one refresh
+interval. Each tenant database has its own filter.
+"""
+from flask import current_app, g
+from sqlalchemy import delete
+from datetime import datetime, timedelta
+import hashlib
+import threading
+import time
+
+from models import db, RevokedToken
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, bits=1 << 20, hashes=7):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray(bits // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=32).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little') | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationCache:
+    """Per-process view of the revoked_tokens table"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = None
+        self.cursor = None  # Wall-clock time the last read started
+        self.refreshed_at = 0
+        self.rebuilt_at = 0
+
+    @staticmethod
+    def _keys(row):
+        if row.jti:
+            yield f'jti:{row.jti}'
+        if row.user_id is not None and row.revoked_before is not None:
+            yield f'user:{row.user_id}'
+
+    def rebuild(self):
+        bloom = BloomFilter(bits=current_app.config.get('REVOCATION_BLOOM_BITS', 1 << 20))
+        # Take the cursor first so rows inserted during the rebuild are picked up by the next refresh
+        cursor = datetime.utcnow()
+        rows = db.session.query(
+            RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_before
+        ).filter(RevokedToken.expires_at > cursor).all()
+        for row in rows:
+            for key in self._keys(row):
+                bloom.add(key)
+
+        with self.lock:
+            self.filter = bloom
+            self.cursor = cursor
+            self.refreshed_at = self.rebuilt_at = time.monotonic()
+
+    def refresh(self):
+        # created_at is set before commit, so a row may become visible after
+        # a later one; adding a key twice is harmless
+        cursor = datetime.utcnow()
+        overlap = timedelta(seconds=current_app.config.get('REVOCATION_REFRESH_OVERLAP_SECONDS', 30))
+        rows = db.session.query(
+            RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_before
+        ).filter(RevokedToken.created_at > self.cursor - overlap).all()
+        with self.lock:
+            for row in rows:
+                for key in self._keys(row):
+                    self.filter.add(key)
+            self.cursor = cursor
+            self.refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self.filter is None or now - self.rebuilt_at > current_app.config.get('REVOCATION_REBUILD_SECONDS', 3600):
+            self.rebuild()
+        elif now - self.refreshed_at > current_app.config.get('REVOCATION_REFRESH_SECONDS', 1):
+            self.refresh()
+
+    def might_contain(self, key):
+        return key in self.filter
+
+    def add_local(self, row):
+        """Make a revocation committed by this process visible immediately"""
+        if self.filter is None:
+            return
+        with self.lock:
+            for key in self._keys(row):
+                self.filter.add(key)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def current_cache():
+    """Revocation cache of the current tenant's database"""
+    key = g.get('tenant_bind')
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = RevocationCache()
+        return _caches[key]
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """token_in_blocklist_loader callback"""
+    cache = current_cache()
+    cache.ensure_fresh()
+
+    jti = jwt_payload.get('jti')
+    user_id = jwt_payload.get('sub')
+
+    if jti and cache.might_contain(f'jti:{jti}'):
+        if db.session.query(RevokedToken.id).filter(RevokedToken.jti == jti).first():
+            return True
+
+    if user_id is not None and cache.might_contain(f'user:{user_id}'):
+        issued_ms = jwt_payload.get('iat_ms', jwt_payload.get('iat', 0) * 1000)
+        issued_at = EPOCH + timedelta(milliseconds=issued_ms)
+        revoked = db.session.query(RevokedToken.id).filter(
+            RevokedToken.user_id == user_id,
+            RevokedToken.revoked_before != None,
+            RevokedToken.revoked_before > issued_at
+        ).first()
+        if revoked:
+            return True
+
+    return False
+
+
+def issued_at_claims(identity):
+    """additional_claims_loader callback: millisecond issue time
+
+    ``iat`` has one-second resolution, which cannot tell a token revoked by a
+    password change apart from the replacement issued in the same second.
+    """
+    return {'iat_ms': int(time.time() * 1000)}
+
+
+def _token_lifetime():
+    return current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+
+
+def revoke_token(jwt_payload, reason='logout'):
+    """Revoke a single token; commit is left to the caller"""
+    row = RevokedToken(
+        jti=jwt_payload['jti'],
+        user_id=jwt_payload.get('sub'),
+        reason=reason,
+        expires_at=datetime.utcfromtimestamp(jwt_payload['exp'])
+    )
+    db.session.add(row)
+    return row
+
+
+def revoke_user_tokens(user_id, reason):
+    """Revoke every token issued to a user until now; commit is left to the caller"""
+    now = datetime.utcnow()
+    # Same resolution as the iat_ms claim: a token issued in this millisecond stays valid
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    row = RevokedToken(
+        user_id=user_id,
+        revoked_before=now,
+        reason=reason,
+        expires_at=now + _token_lifetime()
+    )
+    db.session.add(row)
+    return row
+
+
+def purge_expired_revocations(now=None):
+    """Delete revocations whose tokens have all expired; returns the number removed"""
+    removed = db.session.execute(
+        delete(RevokedToken).where(RevokedToken.expires_at < (now or datetime.utcnow()))
+    ).rowcount
+    db.session.commit()
+    return removed
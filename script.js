@@ -9,8 +9,33 @@ function changeTheme(theme) {
 window.addEventListener('DOMContentLoaded', () => {
     const savedTheme = localStorage.getItem('selectedTheme') || 'black';
     document.body.className = `theme-${savedTheme}`;
+    
+    loadTenants();
 });
 
+// Campus Selection
+async function loadTenants() {
+    const result = await apiGetTenants();
+    
+    // Only offer a choice when more than one campus is configured
+    if (!result.success || result.tenants.length < 2) {
+        return;
+    }
+    
+    const selected = localStorage.getItem('tenant') || result.default;
+    ['loginTenant', 'registerTenant'].forEach(id => {
+        const select = document.getElementById(id);
+        select.innerHTML = result.tenants.map(tenant => `<option value="${tenant}">${tenant}</option>`).join('');
+        select.value = result.tenants.includes(selected) ? selected : result.default;
+        select.closest('.campus-selector').classList.remove('hidden');
+    });
+}
+
+function selectedTenant(id) {
+    const select = document.getElementById(id);
+    return select.closest('.campus-selector').classList.contains('hidden') ? null : select.value;
+}
+
 // Form Switching
 function showRegisterForm() {
     document.getElementById('loginForm').classList.add('hidden');
@@ -30,6 +55,8 @@ async function handleLogin(event) {
     const password = document.getElementById('loginPassword').value;
     const role = document.querySelector('input[name="loginRole"]:checked').value;
     
+    apiSetTenant(selectedTenant('loginTenant'));
+    
     // Try backend API first
     const result = await apiLogin({ username, password, role });
     
@@ -71,6 +98,8 @@ async function handleRegister(event) {
     const confirmPassword = document.getElementById('registerConfirmPassword').value;
     const role = document.querySelector('input[name="registerRole"]:checked').value;
     
+    apiSetTenant(selectedTenant('registerTenant'));
+    
     // Validation
     if (password !== confirmPassword) {
         showNotification('كلمات المرور غير متطابقة', 'error');
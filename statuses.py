@@ -0,0 +1,108 @@
+"""Compact integer status enums and their state machines.
+
+Statuses are stored as SMALLINT columns; the Arabic labels only exist at
+the API boundary (``label()`` for responses, ``parse_status()`` for input).
+"""
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+from enum import IntEnum
+
+
+class ApplicationStatus(IntEnum):
+    PENDING = 0
+    APPROVED = 1
+    REJECTED = 2
+
+
+class RequestStatus(IntEnum):
+    PENDING = 0
+    APPROVED = 1
+    REJECTED = 2
+    EXPIRED = 3
+
+
+class RegistrationStatus(IntEnum):
+    REGISTERED = 0
+    ATTENDED = 1
+    ABSENT = 2
+    CANCELLED = 3
+
+
+LABELS = {
+    ApplicationStatus: {
+        ApplicationStatus.PENDING: 'قيد الانتظار',
+        ApplicationStatus.APPROVED: 'مقبول',
+        ApplicationStatus.REJECTED: 'مرفوض'
+    },
+    RequestStatus: {
+        RequestStatus.PENDING: 'قيد الانتظار',
+        RequestStatus.APPROVED: 'مقبول',
+        RequestStatus.REJECTED: 'مرفوض',
+        RequestStatus.EXPIRED: 'منتهي'
+    },
+    RegistrationStatus: {
+        RegistrationStatus.REGISTERED: 'مسجل',
+        RegistrationStatus.ATTENDED: 'حضر',
+        RegistrationStatus.ABSENT: 'غائب',
+        RegistrationStatus.CANCELLED: 'ملغي'
+    }
+}
+
+# Allowed status changes; anything not listed is rejected
+TRANSITIONS = {
+    ApplicationStatus: {
+        ApplicationStatus.PENDING: {ApplicationStatus.APPROVED, ApplicationStatus.REJECTED},
+        # Employees may revise or reopen a decision
+        ApplicationStatus.APPROVED: {ApplicationStatus.REJECTED, ApplicationStatus.PENDING},
+        ApplicationStatus.REJECTED: {ApplicationStatus.APPROVED, ApplicationStatus.PENDING}
+    },
+    RequestStatus: {
+        RequestStatus.PENDING: {RequestStatus.APPROVED, RequestStatus.REJECTED, RequestStatus.EXPIRED},
+        RequestStatus.APPROVED: set(),
+        RequestStatus.REJECTED: set(),
+        RequestStatus.EXPIRED: set()
+    },
+    RegistrationStatus: {
+        RegistrationStatus.REGISTERED: {RegistrationStatus.ATTENDED, RegistrationStatus.ABSENT, RegistrationStatus.CANCELLED},
+        # Attendance can be corrected after the event
+        RegistrationStatus.ATTENDED: {RegistrationStatus.ABSENT},
+        RegistrationStatus.ABSENT: {RegistrationStatus.ATTENDED},
+        RegistrationStatus.CANCELLED: {RegistrationStatus.REGISTERED}
+    }
+}
+
+
+def label(status):
+    """Arabic label of a status, for API responses"""
+    if status is None:
+        return None
+    return LABELS[type(status)][status]
+
+
+def parse_status(enum_cls, value):
+    """Parse an Arabic label (or enum name) from API input; raises ValueError"""
+    for status, status_label in LABELS[enum_cls].items():
+        if value == status_label or value == status.name:
+            return status
+    raise ValueError(f'Invalid {enum_cls.__name__}: {value!r}')
+
+
+def can_transition(current, new):
+    """Whether the state machine allows moving from `current` to `new`"""
+    return new in TRANSITIONS[type(current)][current]
+
+
+class IntEnumType(TypeDecorator):
+    """SMALLINT column that loads as an IntEnum member"""
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_cls = enum_cls
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.enum_cls(int(value))
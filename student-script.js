@@ -14,13 +14,18 @@ window.addEventListener('DOMContentLoaded', () => {
     const savedTheme = localStorage.getItem('selectedTheme') || 'black';
     document.body.className = `dashboard-body theme-${savedTheme}`;
     
-    // Load applications
-    loadMyApplications();
-    
-    // Load employee requests
-    loadEmployeeRequests();
+    // Load applications and employee requests in one request
+    loadDashboard();
 });
 
+// Load Dashboard
+async function loadDashboard() {
+    const result = await apiGetStudentDashboard('applications,requests');
+    
+    displayMyApplications(result.success && result.applications ? result.applications : []);
+    setEmployeeRequests(result.success ? result.requests : null, result.message);
+}
+
 // Theme Management
 function changeTheme(theme) {
     document.body.className = `dashboard-body theme-${theme}`;
@@ -29,8 +34,8 @@ function changeTheme(theme) {
 }
 
 // Logout
-function logout() {
-    apiLogout();
+async function logout() {
+    await apiLogout();
     window.location.href = 'index.html';
 }
 
@@ -83,14 +88,10 @@ async function submitApplicationForm(event) {
 // Load My Applications
 async function loadMyApplications() {
     const apiResult = await apiGetMyApplications();
-    let applications = [];
-    
-    if (apiResult.success && apiResult.applications) {
-        applications = apiResult.applications;
-    } else {
-        applications = [];
-    }
-    
+    displayMyApplications(apiResult.success && apiResult.applications ? apiResult.applications : []);
+}
+
+function displayMyApplications(applications) {
     const container = document.getElementById('myApplicationsList');
     
     if (applications.length === 0) {
@@ -146,13 +147,16 @@ let currentRequestId = null;
 async function loadEmployeeRequests() {
     console.log('Loading employee requests...');
     const result = await apiGetStudentRequests();
-    
-    if (result.success && result.requests) {
-        employeeRequests = result.requests;
+    setEmployeeRequests(result.success ? result.requests : null, result.message);
+}
+
+function setEmployeeRequests(requests, message) {
+    if (requests) {
+        employeeRequests = requests;
         console.log('Employee requests loaded:', employeeRequests.length);
         displayEmployeeRequests(employeeRequests);
     } else {
-        console.log('No employee requests or error:', result.message);
+        console.log('No employee requests or error:', message);
         document.getElementById('employeeRequestsList').innerHTML = `
             <div class="application-item">
                 <p style="text-align: center; color: var(--text-secondary);">
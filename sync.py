@@ -0,0 +1,95 @@
+"""Delta sync helpers for list endpoints (``?since=<watermark>``).
+
+A watermark is the server time at which a listing was taken. Passing it
+back as ``since`` returns only rows whose indexed ``updated_at`` moved past
+it, plus the ids of rows deleted since then (tombstones). Rows committed
+by slow transactions are caught by re-reading a small overlap window, so
+clients must upsert by id.
+
+A tombstone of a row only one user could list records that user, and is
+only reported to them. A row that leaves other users' listings without
+being deleted (a general employee request answered by one student) gets a
+tombstone through ``record_withdrawal``.
+"""
+from flask import current_app, g
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+
+from models import db, Activity, ActivityRegistration, Application, EmployeeRequest, Tombstone
+
+# Models whose deletions are recorded as tombstones
+TRACKED_MODELS = (Activity, ActivityRegistration, Application, EmployeeRequest)
+
+# Column naming the only user who can list a row (None there: everyone)
+AUDIENCE_COLUMNS = {EmployeeRequest: 'student_id'}
+
+
+def new_watermark():
+    """Watermark for a listing taken now"""
+    return datetime.utcnow().isoformat()
+
+
+def parse_since(value):
+    """Parse a client watermark into the lower bound for changed rows
+
+    Returns None when no watermark was given or it is older than the
+    tombstone retention window, in which case the client needs a full
+    listing. Raises ValueError for malformed watermarks.
+    """
+    if not value:
+        return None
+
+    since = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+    retention = timedelta(days=current_app.config.get('SYNC_TOMBSTONE_TTL_DAYS', 30))
+    if since < datetime.utcnow() - retention:
+        return None
+
+    overlap = current_app.config.get('SYNC_WATERMARK_OVERLAP_SECONDS', 5)
+    if g.get('db_read_bind'):
+        # A replica may trail the watermark's clock by up to its allowed lag
+        overlap += current_app.config.get('REPLICA_MAX_LAG_SECONDS', 5)
+
+    return since - timedelta(seconds=overlap)
+
+
+def deleted_ids(entity, since, user_id=None):
+    """Ids of `entity` rows deleted after `since` (only those `user_id` could list, if given)"""
+    query = db.session.query(Tombstone.entity_id).filter(
+        Tombstone.entity == entity,
+        Tombstone.deleted_at > since
+    )
+    if user_id is not None:
+        query = query.filter((Tombstone.user_id == None) | (Tombstone.user_id == user_id))
+    return [row.entity_id for row in query]
+
+
+def _audience(instance):
+    column = AUDIENCE_COLUMNS.get(type(instance))
+    return getattr(instance, column) if column else None
+
+
+def record_withdrawal(instance):
+    """Tombstone a row that leaves the listings of the users who could see it, without being deleted"""
+    db.session.add(Tombstone(entity=instance.__tablename__, entity_id=instance.id, user_id=_audience(instance)))
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_tombstones(session, flush_context, instances):
+    """Write a tombstone for every tracked row deleted through the ORM"""
+    tombstones = [
+        Tombstone(entity=instance.__tablename__, entity_id=instance.id, user_id=_audience(instance))
+        for instance in session.deleted
+        if isinstance(instance, TRACKED_MODELS) and instance.id is not None
+    ]
+    if tombstones:
+        session.add_all(tombstones)
+
+
+def purge_tombstones(now=None):
+    """Delete tombstones older than the retention window; returns the number removed"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=current_app.config.get('SYNC_TOMBSTONE_TTL_DAYS', 30))
+    removed = db.session.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff)).rowcount
+    db.session.commit()
+    return removed
@@ -0,0 +1,142 @@
+"""Per-campus (tenant) databases.
+
+Every tenant listed in ``TENANT_DATABASE_URIS`` (``name=uri`` pairs,
+comma-separated) gets its own SQLAlchemy bind named ``tenant_<name>``; the
+default tenant (``DEFAULT_TENANT``) lives in the primary database. A
+schema-per-tenant layout works the same way, with a URI that selects the
+schema (e.g. PostgreSQL ``?options=-csearch_path%3Dcampus_a``).
+
+The tenant of a request comes from the ``tenant`` claim of its JWT, or the
+``X-Tenant`` header before login. ``RoutingSession`` sends every query and
+flush of the request to that tenant's bind, so one campus's load only hits
+its own database. Background workers visit each tenant in turn with
+``tenant_context``, and cross-tenant admin queries run on every tenant in
+parallel with ``fan_out``.
+
+For local testing, point each tenant at its own SQLite file:
+
+    TENANT_DATABASE_URIS=campus_a=sqlite:///campus_a.db,campus_b=sqlite:///campus_b.db
+"""
+from flask import current_app, g, has_app_context, jsonify, request
+from flask_jwt_extended import decode_token
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+TENANT_BIND_PREFIX = 'tenant_'
+TENANT_CLAIM = 'tenant'
+TENANT_HEADER = 'X-Tenant'
+
+
+def configure_tenants(app):
+    """Register tenant URIs from the environment as SQLAlchemy binds"""
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for pair in app.config.get('TENANT_DATABASE_URIS', '').split(','):
+        name, _, uri = pair.partition('=')
+        if name.strip() and uri.strip():
+            binds[f'{TENANT_BIND_PREFIX}{name.strip()}'] = uri.strip()
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def default_tenant():
+    return current_app.config.get('DEFAULT_TENANT', 'main')
+
+
+def tenant_names():
+    """The default tenant followed by every configured tenant"""
+    names = [default_tenant()]
+    for key in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        if key.startswith(TENANT_BIND_PREFIX):
+            names.append(key[len(TENANT_BIND_PREFIX):])
+    return names
+
+
+def tenant_bind(name):
+    """Bind key holding `name`'s data (None for the primary database)"""
+    return None if name == default_tenant() else f'{TENANT_BIND_PREFIX}{name}'
+
+
+def current_tenant():
+    """Tenant of the current request or worker context"""
+    if has_app_context():
+        return g.get('tenant') or default_tenant()
+    return None
+
+
+def tenant_engine(name):
+    engines = current_app.extensions['sqlalchemy'].engines
+    return engines[tenant_bind(name)]
+
+
+@contextmanager
+def tenant_context(name):
+    """Route the session of the current app context to `name`'s database"""
+    previous = (g.get('tenant'), g.get('tenant_bind'))
+    g.tenant, g.tenant_bind = name, tenant_bind(name)
+    try:
+        yield
+    finally:
+        g.tenant, g.tenant_bind = previous
+
+
+# ==================== REQUESTS ====================
+
+def _requested_tenant():
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        try:
+            return decode_token(auth[len('Bearer '):]).get(TENANT_CLAIM) or default_tenant()
+        except Exception:
+            # Invalid tokens are rejected by @jwt_required
+            return default_tenant()
+    return request.headers.get(TENANT_HEADER) or default_tenant()
+
+
+def select_tenant():
+    """before_request hook: route this request to its tenant's database"""
+    tenant = _requested_tenant()
+    if tenant not in tenant_names():
+        return jsonify({'success': False, 'message': 'الجامعة غير معروفة'}), 400
+    g.tenant, g.tenant_bind = tenant, tenant_bind(tenant)
+    return None
+
+
+def tenant_claims(identity):
+    """additional_claims_loader callback: the tenant the token was issued for"""
+    return {TENANT_CLAIM: current_tenant()}
+
+
+def init_tenants(app):
+    app.before_request(select_tenant)
+
+
+# ==================== FAN-OUT ====================
+
+def _run_for_tenant(app, name, func, args):
+    with app.app_context():
+        with tenant_context(name):
+            try:
+                return func(*args)
+            finally:
+                current_app.extensions['sqlalchemy'].session.remove()
+
+
+def fan_out(func, *args):
+    """Run `func(*args)` against every tenant in parallel; returns {tenant: result}
+
+    A tenant whose query fails maps to the exception instead of a result,
+    so one unavailable campus does not fail the whole query.
+    """
+    app = current_app._get_current_object()
+    names = tenant_names()
+    workers = max(1, min(len(names), app.config.get('TENANT_FANOUT_MAX_WORKERS', 8)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(_run_for_tenant, app, name, func, args) for name in names}
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = e
+    return results
@@ -0,0 +1,129 @@
+"""Group commit of the write coalescer on SQLite.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import threading
+
+_tmp = tempfile.mkdtemp()
+os.environ['DATABASE_URI'] = f'sqlite:///{os.path.join(_tmp, "test.db")}'
+os.environ['WRITE_COALESCING'] = 'True'
+os.environ['WRITE_COALESCING_WINDOW_MS'] = '500'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import app  # noqa: E402
+from models import db, Application, User  # noqa: E402
+
+APPLICATION = {
+    'activityType': 'رياضي',
+    'activityNumber': '1',
+    'college': 'كلية الهندسة',
+    'department': 'هندسة الحاسوب',
+    'specialization': 'برمجيات',
+    'phone': '0500000000'
+}
+
+_users = 0
+
+
+def make_users(count):
+    global _users
+    with app.app_context():
+        users = [
+            User(full_name=f'طالب {i}', username=f'test{i}', email=f'test{i}@example.com',
+                 password_hash='x', role='student')
+            for i in range(_users, _users + count)
+        ]
+        _users += count
+        db.session.add_all(users)
+        db.session.commit()
+        return [{'Authorization': f'Bearer {create_access_token(identity=user.id)}'} for user in users]
+
+
+def application_count():
+    with app.app_context():
+        return Application.query.count()
+
+
+def submit_concurrently(headers):
+    barrier = threading.Barrier(len(headers))
+    statuses = []
+
+    def writer(writer_headers):
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(client.post('/api/applications/submit', headers=writer_headers, json=APPLICATION).status_code)
+
+    threads = [threading.Thread(target=writer, args=(h,)) for h in headers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def test_one_commit_per_batch():
+    headers = make_users(3)
+    coalescer = app.extensions['write_coalescer']
+    statements = []
+
+    # Trace the SQL SQLite actually runs, with whether a transaction was open
+    with app.app_context():
+        db.engine.dispose()
+
+        def trace(dbapi_connection, connection_record):
+            dbapi_connection.set_trace_callback(
+                lambda sql: statements.append((sql.split()[0], dbapi_connection.in_transaction))
+            )
+
+        event.listen(db.engine, 'connect', trace)
+    try:
+        batches = coalescer.stats['batches']
+        assert submit_concurrently(headers) == [201, 201, 201]
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'connect', trace)
+            db.engine.dispose()
+
+    commits = [in_transaction for verb, in_transaction in statements if verb == 'COMMIT']
+    assert len(commits) == coalescer.stats['batches'] - batches
+    assert all(in_transaction for verb, in_transaction in statements if verb in ('SAVEPOINT', 'RELEASE'))
+
+
+def _fail_once(event_name):
+    failures = [RuntimeError('commit failed')]
+
+    def fail(session):
+        if failures and threading.current_thread().name == 'write-coalescer' and not session.in_nested_transaction():
+            raise failures.pop()
+
+    event.listen(Session, event_name, fail)
+    return fail
+
+
+def test_failed_batch_commit_retries_each_intent_once():
+    headers = make_users(1)
+    before = application_count()
+    fail = _fail_once('before_commit')
+    try:
+        assert submit_concurrently(headers) == [201]
+    finally:
+        event.remove(Session, 'before_commit', fail)
+    assert application_count() == before + 1
+
+
+def test_commit_that_may_have_reached_the_database_is_not_retried():
+    headers = make_users(1)
+    before = application_count()
+    fail = _fail_once('after_commit')
+    try:
+        assert submit_concurrently(headers) == [500]
+    finally:
+        event.remove(Session, 'after_commit', fail)
+    assert application_count() == before + 1
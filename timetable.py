@@ -0,0 +1,82 @@
+"""Schedule-conflict detection for student activity registrations.
+
+Registration checks use a single range query over the student's
+registrations (overlap means start < other.end and end > other.start), so
+the cost is one indexed lookup rather than a scan in Python. The timetable
+is built with a sort-and-sweep over the student's intervals. Conflicts are
+reported as groups of mutually overlapping (chained) activities rather than
+every overlapping pair, so both the work and the response stay O(n log n)
+and O(n) even when hundreds of registrations all overlap.
+"""
+from models import db, Activity, ActivityRegistration
+from statuses import RegistrationStatus
+
+# Registrations in these statuses no longer occupy the student's schedule
+INACTIVE_REGISTRATION_STATUSES = (RegistrationStatus.CANCELLED,)
+
+
+def find_conflicts(user_id, start_date, end_date, exclude_activity_id=None):
+    """Return the student's registered activities overlapping [start_date, end_date)"""
+    if not start_date or not end_date:
+        return []
+
+    query = db.session.query(Activity).join(
+        ActivityRegistration, ActivityRegistration.activity_id == Activity.id
+    ).filter(
+        ActivityRegistration.user_id == user_id,
+        ActivityRegistration.status.notin_(INACTIVE_REGISTRATION_STATUSES),
+        Activity.start_date < end_date,
+        Activity.end_date > start_date
+    )
+
+    if exclude_activity_id is not None:
+        query = query.filter(Activity.id != exclude_activity_id)
+
+    return query.order_by(Activity.start_date).all()
+
+
+def build_timetable(activities):
+    """Split activities into a conflict-free timetable, conflict groups and unscheduled ones
+
+    The timetable keeps the largest set of non-overlapping activities
+    (earliest-end-first). Each conflict group is a run of activities in
+    start order where every activity overlaps an earlier one in the run.
+    """
+    scheduled = sorted(
+        (activity for activity in activities if activity.start_date and activity.end_date),
+        key=lambda activity: (activity.start_date, activity.end_date)
+    )
+    unscheduled = [activity for activity in activities if not (activity.start_date and activity.end_date)]
+
+    # Sweep in start order; a group continues while the next start is before the group's latest end
+    groups = []
+    group_end = None
+    for activity in scheduled:
+        if group_end is not None and activity.start_date < group_end:
+            groups[-1].append(activity)
+            group_end = max(group_end, activity.end_date)
+        else:
+            groups.append([activity])
+            group_end = activity.end_date
+    conflicts = [group for group in groups if len(group) > 1]
+
+    # Greedy interval scheduling gives a maximum conflict-free subset
+    timetable = []
+    last_end = None
+    for activity in sorted(scheduled, key=lambda activity: activity.end_date):
+        if last_end is None or activity.start_date >= last_end:
+            timetable.append(activity)
+            last_end = activity.end_date
+
+    timetable.sort(key=lambda activity: activity.start_date)
+    return timetable, conflicts, unscheduled
+
+
+def load_student_activities(user_id):
+    """Load every activity the student is actively registered for, in one query"""
+    return db.session.query(Activity).join(
+        ActivityRegistration, ActivityRegistration.activity_id == Activity.id
+    ).filter(
+        ActivityRegistration.user_id == user_id,
+        ActivityRegistration.status.notin_(INACTIVE_REGISTRATION_STATUSES)
+    ).all()